@@ -2,8 +2,14 @@
 ===============================================================================
 Title:      Add UniProt data to Interactor objects
 Outline:    Uses the UniProt class to fetch the metadata, sequence, and
-            structure of MIKC proteins using their UniProt IDs. The data is 
-            stored in the Interactor objects and pickled.
+            structure of MIKC proteins using their UniProt IDs. The data is
+            stored in the Interactor objects and pickled. Interactors that
+            already have UniProt data (or are known to be inactive) are
+            skipped, so reruns only fetch the missing UniProt IDs.
+            Metadata and sequences are fetched in batches of 100 UniProt IDs
+            and structures are downloaded concurrently with aiohttp, because
+            the process is bound by the latency of the UniProt and AlphaFold
+            requests.
 Author:     Alejandro Sánchez Cano
 Date:       02/10/2024
 Time:       3h
@@ -13,37 +19,45 @@ Time:       3h
 # Built-in modules
 import logging
 
+# Third party modules
+from tqdm import tqdm
+
 # Custom modules
 from src.misc.logger import logger
-from src.databases.uniprot import UniProt, UniProtError
+from src.databases.uniprot import UniProt
 from src.entities.interactor import Interactor
 logger.setLevel(logging.INFO)
 
-for interactor in Interactor.iterate():
+# Skip interactors already fetched in a previous run
+interactors = [
+    interactor for interactor in Interactor.iterate()
+    if not interactor.seq and interactor.section != 'Inactive'
+    ]
+
+# Fetch metadata and sequences in batches
+entries = UniProt.fetch_batch([interactor.uniprot_id for interactor in interactors])
 
-    # Logging
-    logger.info(f'Fetching UniProt data for {interactor.uniprot_id}')
+# Fetch structures of active UniProt IDs concurrently
+structures = UniProt.fetch_structures(list(entries))
 
-    # Initialize UniProt object
-    uniprot = UniProt(interactor.uniprot_id)
+# Add UniProt data to Interactor objects
+for interactor in tqdm(interactors):
 
-    # Fetch data
-    try:
-        taxon_id, section, primary_accession, secondary_accession = uniprot.fetch_metadata()
-        sequence = uniprot.fetch_sequence()
-        structure = uniprot.fetch_structure()
-    except UniProtError:
+    # Handle inactive UniProt IDs (not returned by the UniProt REST API)
+    if interactor.uniprot_id not in entries:
         interactor.section = 'Inactive'
+        interactor.pickle()
         logger.error(f'{interactor.uniprot_id} is an inactive UniProt ID')
         continue
 
     # Add data to Interactor object
+    taxon_id, section, primary_accession, secondary_accession, sequence = entries[interactor.uniprot_id]
     interactor.taxon_id = taxon_id
     interactor.section = section
     interactor.primary_accession = primary_accession
     interactor.secondary_accession = secondary_accession
     interactor.seq = sequence
-    interactor.structure = structure
+    interactor.structure = structures[interactor.uniprot_id]
 
     # Save Interactor object
-    interactor.pickle()
\ No newline at end of file
+    interactor.pickle()
@@ -12,24 +12,25 @@ Date:       17/10/2024
 ===============================================================================
 """
 
-# Built-in modules
-import subprocess
-from io import StringIO
-
 # Third-party modules
+import numpy as np
 import pandas as pd
-from multitax import NcbiTx
 
 # Custom modules
 from src.misc import path
+from src.misc import utils
 from src.misc.logger import logger
 from src.entities.interactor import Interactor
+from src.databases.taxonomy import viridiplantae_taxon_ids
 
 class BioGRID:
 
     def __init__(self, version: str):
         self.version = version
 
+        # Modified with '_load_plants()' method
+        self._plants = None
+
     def download_files(self) -> None:
         '''
         Downloads and unzips BioGRID 'ALL' file from the specified 
@@ -40,17 +41,10 @@ class BioGRID:
         output_dir = path.BIOGRID / self.version
         output_dir.mkdir(parents=True, exist_ok=True)
 
-        # Download 'ALL' file
-        url = f'https://downloads.thebiogrid.org/Download/BioGRID/Release-Archive/BIOGRID-{self.version}/'
+        # Download and unzip 'ALL' file
+        url = f'https://downloads.thebiogrid.org/Download/BioGRID/Release-Archive/BIOGRID-{self.version}'
         all_file = f'BIOGRID-ALL-{self.version}.tab3.zip'
-        wget = f'wget {url}/{all_file} -P {output_dir} -q'
-        subprocess.run(wget, shell = True)
-
-        # Unzip file and remove compressed file
-        unzip = f'unzip -qq {output_dir}/{all_file} -d {output_dir}'
-        subprocess.run(unzip, shell = True)
-        rm = f'rm {output_dir}/{all_file}'
-        subprocess.run(rm, shell = True)
+        utils.download_zip(f'{url}/{all_file}', output_dir)
 
         # Logging
         logger.info(f'BioGRID {self.version} "ALL" file downloaded and unzipped')
@@ -58,81 +52,74 @@ class BioGRID:
     def reduce_to_plants(self) -> None:
         '''
         Reduces BioGRID 'ALL' file to only plant interactors to
-        reduce computational burden when searching for UniProt IDs with
-        grep in the whole file.
+        reduce computational burden when searching for UniProt IDs in
+        the whole file. The 'ALL' file is streamed in chunks to avoid
+        loading it entirely in memory.
         '''
 
         # Set up file paths
         all_filepath = path.BIOGRID / self.version / f'BIOGRID-ALL-{self.version}.tab3.txt'
         plant_filepath = path.BIOGRID / self.version / f'BIOGRID-plants-{self.version}.tab3.txt'
 
-        # Read BioGRID 'ALL' file as pandas DataFrame
-        df = pd.read_csv(all_filepath, sep = '\t', dtype=str)
-
-        # Filter only plant interactors
-        ncbi_tx = NcbiTx()
-        df_plants = df[df['Organism ID Interactor A'].apply(lambda x: 'Viridiplantae' in ncbi_tx.name_lineage(x))]
-
-        # Save filtered file
-        df_plants.to_csv(plant_filepath, sep = '\t', index = False)
+        # Stream BioGRID 'ALL' file in chunks and save only plant interactors
+        viridiplantae = viridiplantae_taxon_ids()
+        n_all, n_plants = 0, 0
+        chunks = pd.read_csv(all_filepath, sep = '\t', dtype = str, chunksize = 200_000)
+        with open(plant_filepath, 'w', newline = '') as handle:
+            for idx, df in enumerate(chunks):
+                df_plants = df[df['Organism ID Interactor A'].isin(viridiplantae)]
+                df_plants.to_csv(handle, sep = '\t', index = False, header = idx == 0)
+                n_all += len(df)
+                n_plants += len(df_plants)
 
         # Logging
-        logger.info(f'BioGRID {self.version} "ALL" file ({len(df)} PPIs) reduced to only plant interactions ({len(df_plants)} PPIs)')
+        logger.info(f'BioGRID {self.version} "ALL" file ({n_all} PPIs) reduced to only plant interactions ({n_plants} PPIs)')
 
-    def _grep(self, uniprot_id: str) -> pd.DataFrame:
+    def _load_plants(self) -> pd.DataFrame:
         '''
-        Searches for a specific UniProt ID in the BioGRID 'plants' file and
-        retrieves its interactions in BioGRID.
-
-        Parameters
-        ----------
-        uniprot_id : str
-            UniProt ID to search for.
+        Loads the BioGRID 'plants' file as a pandas DataFrame. The file is
+        only read once and cached in the instance, so that all MADS
+        interactors can be searched in a single in-memory pass instead of
+        grepping the file once per UniProt ID.
 
         Returns
         -------
         pd.DataFrame
-            Interaction table of the given UniProt ID.
+            Interaction table of the BioGRID 'plants' file.
         '''
+        if self._plants is None:
+            # Set up file path
+            file_path = path.BIOGRID / self.version / f'BIOGRID-plants-{self.version}.tab3.txt'
 
-        # Set up file path
-        file_path = path.BIOGRID / self.version / f'BIOGRID-plants-{self.version}.tab3.txt'
+            # Read BioGRID 'plants' file (header starts with '#')
+            plants = pd.read_csv(file_path, sep = '\t', dtype = str)
+            plants.columns = plants.columns.str.lstrip('#')
+            self._plants = plants
 
-        # First line as columns
-        cat = f'head -1 {file_path}'
-        result = subprocess.run(cat, shell = True, text = True, stdout = subprocess.PIPE)
-        columns = result.stdout.lstrip('#').rstrip().split('\t')
-
-        # Search for UniProt ID in BioGRID 'ALL' file
-        grep = f'grep {uniprot_id} {file_path}'
-        result = subprocess.run(grep, shell = True, text = True, stdout = subprocess.PIPE)
-        
-        # Convert result to DataFrame
-        if result.stdout == '':
-            return pd.DataFrame(columns = columns)
-        else:
-            result = StringIO(result.stdout)
-            return pd.read_csv(result, sep = '\t', names = columns)
+        return self._plants
         
     def mads_vs_all(self) -> None:
         '''
         Searches for MADS interactors in the BioGRID 'plants' file and
-        retrieves their interactions in BioGRID.
+        retrieves their interactions in BioGRID. All the UniProt IDs are
+        searched at once by splitting every line into words and checking
+        them against the set of MADS UniProt IDs.
         '''
-        # Initialize DataFrame
-        mads_vs_all = pd.DataFrame()
-
-        # Iterate over MADS interactors
-        for interactor in Interactor.iterate():
-            # Search for UniProt ID in BioGRID 'plants' file
-            df = self._grep(interactor.uniprot_id)
-            # Append to DataFrame if not empty
-            if not df.empty:
-                mads_vs_all = pd.concat([mads_vs_all, df], ignore_index = True)
+        # Load BioGRID 'plants' file
+        plants = self._load_plants()
+
+        # MADS UniProt IDs
+        mads = set(Interactor.mapping())
+
+        # Lines of the BioGRID 'plants' file containing any MADS UniProt ID
+        lines = plants.iloc[:, 0].str.cat(plants.iloc[:, 1:], sep = '\t', na_rep = '')
+        words = lines.str.findall(r'\w+').explode()
+        is_there_mikc = words.isin(mads).groupby(level = 0).any()
+        mads_vs_all = plants[is_there_mikc]
         
         # Save DataFrame
-        filepath = path.NETWORKS / f'BioGRID_{self.version}_MADS_vs_ALL.tsv'
-        mads_vs_all.to_csv(filepath, sep = '\t', index = False)
+        filepath = path.NETWORKS / f'BioGRID_{self.version}_MADS_vs_ALL.parquet'
+        mads_vs_all.to_parquet(filepath, compression = 'zstd', index = False)
 
         # Logging
         logger.info(f'MADS vs. all PPIs in BioGRID {self.version} "plants" file -> dim({mads_vs_all.shape})')
@@ -141,40 +128,51 @@ class BioGRID:
         '''
         Filters MADS vs. MADS interactions from the MADS vs. ALL by 
         checking whether any of the SWISS-PROT or TrEMBL IDs are in the
-        MIKC list from InterPro.
+        MIKC list from InterPro. The concatenated SWISS-PROT and TrEMBL 
+        IDs of each interactor are saved as extra columns to avoid 
+        recomputing them in 'standarize()'.
         '''
         # Load MADS_vs_ALL DataFrame
-        filepath = path.NETWORKS / f'BioGRID_{self.version}_MADS_vs_ALL.tsv'
-        mads_vs_all = pd.read_csv(filepath, sep = '\t')
+        filepath = path.NETWORKS / f'BioGRID_{self.version}_MADS_vs_ALL.parquet'
+        mads_vs_all = pd.read_parquet(filepath)
 
         # MADS UniProt IDs
-        mads = set([interactor.uniprot_id for interactor in Interactor.iterate()])
-
-        # Concatenate UniProt IDs column A
-        uniprot_columns_A = ['SWISS-PROT Accessions Interactor A', 'TREMBL Accessions Interactor A']
-        concatenate = lambda row: '|'.join(row).replace('-|', '').rstrip('|-').split('|')
-        uniprot_ids_A = mads_vs_all[uniprot_columns_A].apply(concatenate, axis = 1)
-        is_there_mikc = lambda x: len(set(x) - mads) < len(x)
-        mads_vs_mads_A = uniprot_ids_A.apply(is_there_mikc)
-
-        # Concatenate UniProt IDs column B
-        uniprot_columns_B = ['SWISS-PROT Accessions Interactor B', 'TREMBL Accessions Interactor B']
-        concatenate = lambda row: '|'.join(row).replace('-|', '').rstrip('|-').split('|')
-        uniprot_ids_B = mads_vs_all[uniprot_columns_B].apply(concatenate, axis = 1)
-        is_there_mikc = lambda x: len(set(x) - mads) < len(x)
-        mads_vs_mads_B = uniprot_ids_B.apply(is_there_mikc)
+        mads = set(Interactor.mapping())
+
+        # Concatenate UniProt IDs column A (stored to be reused in 'standarize()')
+        concatenate = lambda swissprot, trembl: (
+            swissprot.fillna('-')
+            .str.cat(trembl.fillna('-'), sep = '|')
+            .str.replace('-|', '', regex = False)
+            .str.rstrip('|-')
+            )
+        mads_vs_all['UniProt IDs Interactor A'] = concatenate(
+            mads_vs_all['SWISS-PROT Accessions Interactor A'], 
+            mads_vs_all['TREMBL Accessions Interactor A']
+            )
+        uniprot_ids_A = mads_vs_all['UniProt IDs Interactor A'].str.split('|')
+        is_there_mikc = lambda ids: ids.explode().isin(mads).groupby(level = 0).any()
+        mads_vs_mads_A = is_there_mikc(uniprot_ids_A)
+
+        # Concatenate UniProt IDs column B (stored to be reused in 'standarize()')
+        mads_vs_all['UniProt IDs Interactor B'] = concatenate(
+            mads_vs_all['SWISS-PROT Accessions Interactor B'], 
+            mads_vs_all['TREMBL Accessions Interactor B']
+            )
+        uniprot_ids_B = mads_vs_all['UniProt IDs Interactor B'].str.split('|')
+        mads_vs_mads_B = is_there_mikc(uniprot_ids_B)
 
         # Filter MADS vs MADS interactions
         mads_vs_mads = mads_vs_all[mads_vs_mads_A & mads_vs_mads_B]
 
         # Save DataFrame
-        filepath = path.NETWORKS / f'BioGRID_{self.version}_MADS_vs_MADS.tsv'
-        mads_vs_mads.to_csv(filepath, sep = '\t', index = False)
+        filepath = path.NETWORKS / f'BioGRID_{self.version}_MADS_vs_MADS.parquet'
+        mads_vs_mads.to_parquet(filepath, compression = 'zstd', index = False)
 
         # Logging
         logger.info(f'MADS vs. MADS PPIs in BioGRID {self.version} "plants" file -> dim({mads_vs_mads.shape})')
 
-    def __find_best_uniprot_id_candidate(self, uniprot_ids: list[str]) -> str:
+    def __find_best_uniprot_id_candidate(self, uniprot_ids: list[str], valid_uniprot_ids: set[str]) -> str:
         '''
         Given a list of UniProt IDs, returns the best candidate to be 
         used as the main UniProt ID in the database.
@@ -183,29 +181,16 @@ class BioGRID:
         ----------
         uniprot_ids : list[str]
             List of UniProt IDs to be considered.
+        valid_uniprot_ids : set[str]
+            UniProt IDs in the database (with domains) from Swiss-Prot.
 
         Returns
         -------
         str
             Main UniProt ID to be used
         '''
-        # Initialize return list to be filled
-        candidate = []
-
-        # Iterate over UniProt IDs
-        for uniprot_id in uniprot_ids:
-
-            # Discard UniProt IDs not in database
-            interactor = Interactor(uniprot_id)
-            if interactor.domains == {}:
-                continue
-            
-            # Discard TREBML
-            if interactor.section != 'Swiss-Prot':
-                continue
-            
-            # Append to candidate list
-            candidate.append(uniprot_id)
+        # Discard UniProt IDs not in database or from TrEMBL
+        candidate = [uniprot_id for uniprot_id in uniprot_ids if uniprot_id in valid_uniprot_ids]
         
         # Logging and manage errors
         if len(candidate) == 0:
@@ -232,32 +217,39 @@ class BioGRID:
         - Seq: Sequence of interactor A : sequence of interactor B
         '''
         # Load MADS_vs_MADS DataFrame
-        filepath = path.NETWORKS / f'BioGRID_{self.version}_MADS_vs_MADS.tsv'
-        mads_vs_mads = pd.read_csv(filepath, sep = '\t')
+        filepath = path.NETWORKS / f'BioGRID_{self.version}_MADS_vs_MADS.parquet'
+        mads_vs_mads = pd.read_parquet(filepath)
+
+        # Valid UniProt IDs: in database (with domains) and from Swiss-Prot
+        valid_uniprot_ids = {
+            uniprot_id for uniprot_id, interactor in Interactor.mapping().items()
+            if interactor.domains != {} and interactor.section == 'Swiss-Prot'
+            }
 
-        # Find best UniProt ID candicate in column A
-        columns_uniprot_A = ['SWISS-PROT Accessions Interactor A', 'TREMBL Accessions Interactor A']
-        concatenate = lambda row: '|'.join(row).replace('-|', '').rstrip('|-').split('|')
-        uniprot_ids_A = mads_vs_mads[columns_uniprot_A].apply(concatenate, axis = 1).to_list()
-        A = [self.__find_best_uniprot_id_candidate(uniprot_ids) for uniprot_ids in uniprot_ids_A]
+        # Find best UniProt ID candicate in column A (concatenated in 'mads_vs_mads()')
+        uniprot_ids_A = mads_vs_mads['UniProt IDs Interactor A'].fillna('').str.split('|').to_list()
+        A = [self.__find_best_uniprot_id_candidate(uniprot_ids, valid_uniprot_ids) for uniprot_ids in uniprot_ids_A]
 
-        # Find best UniProt ID candicate in column B
-        columns_uniprot_B = ['SWISS-PROT Accessions Interactor B', 'TREMBL Accessions Interactor B']
-        concatenate = lambda row: '|'.join(row).replace('-|', '').rstrip('|-').split('|')
-        uniprot_ids_B = mads_vs_mads[columns_uniprot_B].apply(concatenate, axis = 1).to_list()
-        B = [self.__find_best_uniprot_id_candidate(uniprot_ids) for uniprot_ids in uniprot_ids_B]
+        # Find best UniProt ID candicate in column B (concatenated in 'mads_vs_mads()')
+        uniprot_ids_B = mads_vs_mads['UniProt IDs Interactor B'].fillna('').str.split('|').to_list()
+        B = [self.__find_best_uniprot_id_candidate(uniprot_ids, valid_uniprot_ids) for uniprot_ids in uniprot_ids_B]
 
         # Assign columns
         mads_vs_mads['A'] = A
         mads_vs_mads['B'] = B
-        mads_vs_mads['A=B'] = mads_vs_mads[['A', 'B']].apply(lambda x: '='.join(sorted(x)), axis = 1)
+        is_sorted = mads_vs_mads['A'] <= mads_vs_mads['B']
+        A_B = mads_vs_mads['A'] + '=' + mads_vs_mads['B']
+        B_A = mads_vs_mads['B'] + '=' + mads_vs_mads['A']
+        mads_vs_mads['A=B'] = np.where(is_sorted, A_B, B_A)
         mads_vs_mads['Species_A'] = mads_vs_mads['Organism ID Interactor A']
         mads_vs_mads['Species_B'] = mads_vs_mads['Organism ID Interactor B']
-        mads_vs_mads['Seq_A'] = [Interactor(uniprot_id).seq for uniprot_id in A]
-        mads_vs_mads['Seq_B'] = [Interactor(uniprot_id).seq for uniprot_id in B]
+        seqs = {uniprot_id: interactor.seq for uniprot_id, interactor in Interactor.mapping().items()}
+        mads_vs_mads['Seq_A'] = mads_vs_mads['A'].map(seqs).fillna('')
+        mads_vs_mads['Seq_B'] = mads_vs_mads['B'].map(seqs).fillna('')
         mads_vs_mads['Seq'] = mads_vs_mads['Seq_A'] + ':' + mads_vs_mads['Seq_B']
                                                                          
-        # Remove duplicated columns
+        # Remove duplicated columns (Arrow-backed strings hash faster)
+        mads_vs_mads = mads_vs_mads.astype({'A=B': 'string[pyarrow]', 'Seq': 'string[pyarrow]'})
         mads_vs_mads = mads_vs_mads.drop_duplicates('A=B')
         mads_vs_mads = mads_vs_mads.drop_duplicates('Seq')
 
@@ -19,15 +19,15 @@ from src.databases.interpro_database import InterProDatabase
 # MADS proteins -> 1h 20min
 mads = InterProDatabase('IPR002100')
 mads.get_metadata()
-m_uniprot_ids = mads.get_uniprot()
+m_uniprot_ids = set(mads.iter_uniprot())
 
 # K-box proteins -> 20min
 kbox = InterProDatabase('IPR002487')
 kbox.get_metadata()
-k_uniprot_ids = kbox.get_uniprot()
+k_uniprot_ids = set(kbox.iter_uniprot())
 
-# Union of UniProt IDs
-mikc_uniprot_ids = sorted(list(set(m_uniprot_ids) & set(k_uniprot_ids)))
+# Intersection of UniProt IDs
+mikc_uniprot_ids = sorted(m_uniprot_ids & k_uniprot_ids)
 
 # Logging
 logger.info(f'{len(mikc_uniprot_ids)} MIKC UniProt IDs retrieved')
@@ -37,5 +37,4 @@ logger.info(f'{len(mikc_uniprot_ids)/len(k_uniprot_ids)*100:.2f}% of K-box prote
 # Save MIKC UniProt IDs
 output_file = path.DATA / 'm_and_k_uniprot_ids.txt'
 with open(output_file, 'w') as f:
-    for uniprot_id in mikc_uniprot_ids:
-        f.write(f'{uniprot_id}\n')
\ No newline at end of file
+    f.writelines(uniprot_id + '\n' for uniprot_id in mikc_uniprot_ids)
\ No newline at end of file
@@ -14,23 +14,30 @@ Date:       17/10/2025
 
 # Built-in modules
 import re
-import subprocess
-from io import StringIO
 
 # Third-party modules
+import numpy as np
 import pandas as pd
-from multitax import NcbiTx
 
 # Custom modules
 from src.misc import path
+from src.misc import utils
 from src.misc.logger import logger
 from src.entities.interactor import Interactor
+from src.databases.taxonomy import viridiplantae_taxon_ids
+
+# MITAB parsing: 'uniprotkb:P12345-2' -> 'P12345', 'taxid:3702(arath)' -> '3702'
+ID_REGEX = re.compile(r'^[^:-]*:([^:-]*)')
+TAXID_REGEX = re.compile(r'[:\(]([^:\(]*)')
 
 class IntAct:
 
     def __init__(self, version: str):
         self.version = version
 
+        # Modified with '_load_plants()' method
+        self._plants = None
+
     def download_files(self) -> None:
         '''
         Downloads 'intact.txt' file from the specified IntAct version.
@@ -40,18 +47,9 @@ class IntAct:
         output_dir = path.INTACT / self.version
         output_dir.mkdir(parents=True, exist_ok=True)
 
-        # Download file
+        # Download and unzip file (without the negatives file)
         url_file = f'https://ftp.ebi.ac.uk/pub/databases/intact/{self.version}/psimitab/intact.zip'
-        wget = f'wget {url_file} -P {output_dir} -q'
-        subprocess.run(wget, shell = True)
-
-        # Unzip file and remove compressed and negatives file
-        unzip = f'unzip -qq {output_dir}/intact.zip -d {output_dir}'
-        subprocess.run(unzip, shell = True)
-        rm = f'rm {output_dir}/intact.zip'
-        subprocess.run(rm, shell = True)
-        rm = f'rm {output_dir}/intact_negative.txt'
-        subprocess.run(rm, shell = True)
+        utils.download_zip(url_file, output_dir, members = ['intact.txt'])
 
         # Logging
         logger.info(f'IntAct {self.version} "intact.txt" file downloaded')
@@ -59,83 +57,75 @@ class IntAct:
     def reduce_to_plants(self) -> None:
         '''
         Reduces IntAct 'intact.txt' file to only plant interactors to
-        reduce computational burden when searching for UniProt IDs with
-        grep in the whole file.
+        reduce computational burden when searching for UniProt IDs in
+        the whole file. The 'intact.txt' file is streamed in chunks to
+        avoid loading it entirely in memory.
         '''
 
         # Set up file paths
         all_filepath = path.INTACT / self.version / 'intact.txt'
         plant_filepath = path.INTACT / self.version / 'plants.txt'
 
-        # Read IntAct 'intact.txt' file as pandas DataFrame
-        df = pd.read_csv(all_filepath, sep = '\t', dtype=str)
-
-        # Filter interactors to only plants
-        ncbi_tx = NcbiTx()
-        is_plant = lambda x: ncbi_tx.parent_rank(re.split(r'[:\(]', x)[1], 'kingdom') == '33090'
-        df_plants = df[df['Taxid interactor A'].apply(is_plant)]
-             
-        # Save filtered file
-        df_plants.to_csv(plant_filepath, sep = '\t', index = False)
+        # Stream IntAct 'intact.txt' file in chunks and save only plant interactors
+        viridiplantae = viridiplantae_taxon_ids()
+        n_all, n_plants = 0, 0
+        chunks = pd.read_csv(all_filepath, sep = '\t', dtype = str, chunksize = 200_000)
+        with open(plant_filepath, 'w', newline = '') as handle:
+            for idx, df in enumerate(chunks):
+                taxon_ids = df['Taxid interactor A'].str.extract(TAXID_REGEX, expand = False)
+                df_plants = df[taxon_ids.isin(viridiplantae)]
+                df_plants.to_csv(handle, sep = '\t', index = False, header = idx == 0)
+                n_all += len(df)
+                n_plants += len(df_plants)
 
         # Logging
-        logger.info(f'IntAct {self.version} "intact.txt" file ({len(df)} PPIs) reduced to only plant interactions ({len(df_plants)} PPIs)')
+        logger.info(f'IntAct {self.version} "intact.txt" file ({n_all} PPIs) reduced to only plant interactions ({n_plants} PPIs)')
 
-    def _grep(self, uniprot_id: str) -> pd.DataFrame:
+    def _load_plants(self) -> pd.DataFrame:
         '''
-        Searches for a specific UniProt ID in the IntAct 'plants' file and
-        retrieves its interactions in IntAct.
-
-        Parameters
-        ----------
-        uniprot_id : str
-            UniProt ID to search for.
+        Loads the IntAct 'plants.txt' file as a pandas DataFrame. The file
+        is only read once and cached in the instance, so that all MADS
+        interactors can be searched in a single in-memory pass instead of
+        grepping the file once per UniProt ID.
 
         Returns
         -------
         pd.DataFrame
-            Interaction table of the given UniProt ID.
+            Interaction table of the IntAct 'plants.txt' file.
         '''
+        if self._plants is None:
+            # Set up file path
+            file_path = path.INTACT / self.version / 'plants.txt'
 
-        # Set up file path
-        file_path = path.INTACT / self.version / 'plants.txt'
-
-        # First line as columns
-        cat = f'head -1 {file_path}'
-        result = subprocess.run(cat, shell = True, text = True, stdout = subprocess.PIPE)
-        columns = result.stdout.lstrip('#').rstrip().split('\t')
+            # Read IntAct 'plants' file (header starts with '#')
+            plants = pd.read_csv(file_path, sep = '\t', dtype = str)
+            plants.columns = plants.columns.str.lstrip('#')
+            self._plants = plants
 
-        # Search for UniProt ID in IntAct 'ALL' file
-        grep = f'grep {uniprot_id} {file_path}'
-        result = subprocess.run(grep, shell = True, text = True, stdout = subprocess.PIPE)
-        
-        # Convert result to DataFrame
-        if result.stdout == '':
-            return pd.DataFrame(columns = columns)
-        else:
-            result = StringIO(result.stdout)
-            return pd.read_csv(result, sep = '\t', names = columns)
+        return self._plants
     
     def mads_vs_all(self) -> None:
         '''
         Searches for all MADS interactors in the IntAct 'plants.txt' 
-        file and retrieves their interactions in IntAct.
+        file and retrieves their interactions in IntAct. All the UniProt
+        IDs are searched at once by splitting every line into words and 
+        checking them against the set of MADS UniProt IDs.
         '''
-        
-        # Initialize DataFrame
-        mads_vs_all = pd.DataFrame()
-
-        # Iterate over MADS interactors
-        for interactor in Interactor.iterate():
-            # Search for UniProt ID in IntAct 'plants' file
-            df = self._grep(interactor.uniprot_id)
-            # Append to DataFrame if not empty
-            if not df.empty:
-                mads_vs_all = pd.concat([mads_vs_all, df], ignore_index = True)
+        # Load IntAct 'plants' file
+        plants = self._load_plants()
+
+        # MADS UniProt IDs
+        mads = set(Interactor.mapping())
+
+        # Lines of the IntAct 'plants' file containing any MADS UniProt ID
+        lines = plants.iloc[:, 0].str.cat(plants.iloc[:, 1:], sep = '\t', na_rep = '')
+        words = lines.str.findall(r'\w+').explode()
+        is_there_mikc = words.isin(mads).groupby(level = 0).any()
+        mads_vs_all = plants[is_there_mikc]
         
         # Save DataFrame
-        filepath = path.NETWORKS / f'IntAct_{self.version}_MADS_vs_ALL.tsv'
-        mads_vs_all.to_csv(filepath, sep = '\t', index = False)   
+        filepath = path.NETWORKS / f'IntAct_{self.version}_MADS_vs_ALL.parquet'
+        mads_vs_all.to_parquet(filepath, compression = 'zstd', index = False)
 
         # Logging
         logger.info(f'MADS vs. all PPIs in IntAct {self.version} "plants" file -> dim{mads_vs_all.shape}')
@@ -147,21 +137,21 @@ class IntAct:
         the MIKC list from InterPro.
         '''
         # Load MADS_vs_ALL DataFrame
-        filepath = path.NETWORKS / f'IntAct_{self.version}_MADS_vs_ALL.tsv'
-        mads_vs_all = pd.read_csv(filepath, sep = '\t')
+        filepath = path.NETWORKS / f'IntAct_{self.version}_MADS_vs_ALL.parquet'
+        mads_vs_all = pd.read_parquet(filepath)
 
         # MADS UniProt IDs
-        mads = set([interactor.uniprot_id for interactor in Interactor.iterate()])
+        mads = set(Interactor.mapping())
 
         # Filter MADS vs MADS interactions
-        is_there_mikc = lambda x: x.split('-')[0].split(':')[1] in mads
-        mads_vs_mads_A = mads_vs_all['ID(s) interactor A'].apply(is_there_mikc)
-        mads_vs_mads_B = mads_vs_all['ID(s) interactor B'].apply(is_there_mikc)
+        is_there_mikc = lambda ids: ids.str.extract(ID_REGEX, expand = False).isin(mads)
+        mads_vs_mads_A = is_there_mikc(mads_vs_all['ID(s) interactor A'])
+        mads_vs_mads_B = is_there_mikc(mads_vs_all['ID(s) interactor B'])
         mads_vs_mads = mads_vs_all[mads_vs_mads_A & mads_vs_mads_B]
 
         # Save DataFrame
-        filepath = path.NETWORKS / f'IntAct_{self.version}_MADS_vs_MADS.tsv'
-        mads_vs_mads.to_csv(filepath, sep = '\t', index = False)
+        filepath = path.NETWORKS / f'IntAct_{self.version}_MADS_vs_MADS.parquet'
+        mads_vs_mads.to_parquet(filepath, compression = 'zstd', index = False)
 
         # Logging
         logger.info(f'MADS vs. MADS PPIs in IntAct {self.version} "plants" file -> dim{mads_vs_mads.shape}')
@@ -181,20 +171,25 @@ class IntAct:
         - Seq: Sequence of interactor A : sequence of interactor B
         '''
         # Load MADS_vs_MADS DataFrame
-        filepath = path.NETWORKS / f'IntAct_{self.version}_MADS_vs_MADS.tsv'
-        mads_vs_mads = pd.read_csv(filepath, sep = '\t')
+        filepath = path.NETWORKS / f'IntAct_{self.version}_MADS_vs_MADS.parquet'
+        mads_vs_mads = pd.read_parquet(filepath)
 
         # Assign columns
-        mads_vs_mads['A'] = mads_vs_mads['ID(s) interactor A'].apply(lambda x: x.split('-')[0].split(':')[1])
-        mads_vs_mads['B'] = mads_vs_mads['ID(s) interactor B'].apply(lambda x: x.split('-')[0].split(':')[1])
-        mads_vs_mads['A=B'] = mads_vs_mads[['A', 'B']].apply(lambda x: '='.join(sorted(x)), axis = 1)
-        mads_vs_mads['Species_A'] = mads_vs_mads['Taxid interactor A'].apply(lambda x: re.split(r'[:\(]', x)[1])
-        mads_vs_mads['Species_B'] = mads_vs_mads['Taxid interactor B'].apply(lambda x: re.split(r'[:\(]', x)[1])
-        mads_vs_mads['Seq_A'] = mads_vs_mads['A'].apply(lambda x: Interactor(x).seq)
-        mads_vs_mads['Seq_B'] = mads_vs_mads['B'].apply(lambda x: Interactor(x).seq)
+        mads_vs_mads['A'] = mads_vs_mads['ID(s) interactor A'].str.extract(ID_REGEX, expand = False)
+        mads_vs_mads['B'] = mads_vs_mads['ID(s) interactor B'].str.extract(ID_REGEX, expand = False)
+        is_sorted = mads_vs_mads['A'] <= mads_vs_mads['B']
+        A_B = mads_vs_mads['A'] + '=' + mads_vs_mads['B']
+        B_A = mads_vs_mads['B'] + '=' + mads_vs_mads['A']
+        mads_vs_mads['A=B'] = np.where(is_sorted, A_B, B_A)
+        mads_vs_mads['Species_A'] = mads_vs_mads['Taxid interactor A'].str.extract(TAXID_REGEX, expand = False)
+        mads_vs_mads['Species_B'] = mads_vs_mads['Taxid interactor B'].str.extract(TAXID_REGEX, expand = False)
+        seqs = {uniprot_id: interactor.seq for uniprot_id, interactor in Interactor.mapping().items()}
+        mads_vs_mads['Seq_A'] = mads_vs_mads['A'].map(seqs).fillna('')
+        mads_vs_mads['Seq_B'] = mads_vs_mads['B'].map(seqs).fillna('')
         mads_vs_mads['Seq'] = mads_vs_mads['Seq_A'] + ':' + mads_vs_mads['Seq_B']
                                                                          
-        # Remove duplicated columns
+        # Remove duplicated columns (Arrow-backed strings hash faster)
+        mads_vs_mads = mads_vs_mads.astype({'A=B': 'string[pyarrow]', 'Seq': 'string[pyarrow]'})
         mads_vs_mads = mads_vs_mads.drop_duplicates('A=B')
         mads_vs_mads = mads_vs_mads.drop_duplicates('Seq')
 
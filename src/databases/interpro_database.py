@@ -4,8 +4,12 @@ Title:      InterPro Database
 Outline:    InterPro Database class to interact with the InterPro API to 
             retrieve metadata (accession name and number of proteins and 
             AlphaFold structures) and the UniProt accessions associatd with 
-            an InterPro accession IDs (e.g. IPR002100, PF00319, ...).
+            an InterPro accession IDs (e.g. IPR002100, PF00319, ...). The
+            paginated UniProt accessions are retrieved asynchronously with
+            aiohttp over a single keep-alive connection pool and 
+            stream-parsed with ijson.
 Docs:       https://github.com/ProteinsWebTeam/interpro7-api
+            https://github.com/ICRAR/ijson
 Author:     Alejandro Sánchez Cano
 Date:       01/10/2024
 ===============================================================================
@@ -13,14 +17,21 @@ Date:       01/10/2024
 
 # Built-in modules
 import math
-import time
-from typing import Any
+import asyncio
+from typing import Any, Iterator, AsyncIterator
 
 # Third-party modules
+import ijson
+import aiohttp
 import requests
 from tqdm import tqdm
+from urllib3.util import Retry
+from requests.adapters import HTTPAdapter
 
 # Custom modules
+from src.misc import http
+from src.misc import utils
+from src.misc import http_cache
 from src.misc.logger import logger
 
 class InterProDatabase:
@@ -28,6 +39,26 @@ class InterProDatabase:
     # Static attributes
     url = "https://www.ebi.ac.uk/interpro/api"
 
+    # Accession prefix -> source database (in matching order)
+    prefix_map = (
+        ('IPR', 'interpro'),
+        ('cd', 'cdd'),
+        ('G3DSA', 'cathgene3d'),
+        ('P', 'profile')
+        )
+
+    # HTTP session that reuses InterPro connections across requests
+    session = requests.Session()
+    session.mount('https://', HTTPAdapter(
+        pool_connections = 1,
+        pool_maxsize = 8,
+        max_retries = Retry(
+            total = 5, 
+            backoff_factor = 0.3, 
+            status_forcelist = [429, 500, 502, 503, 504]
+            )
+        ))
+
     def __init__(self, accession: str):
         # Modified upon instantiation
         self.accession = accession
@@ -60,19 +91,16 @@ class InterProDatabase:
         str
             InterPro
         '''
-        if self.accession.startswith('IPR'):
-            return 'interpro'
-        elif self.accession.startswith('cd'):
-            return 'cdd'
-        elif self.accession.startswith('G3DSA'):
-            return 'cathgene3d'
-        elif self.accession.startswith('P'):
-            return 'profile'
+        return next(
+            (db for prefix, db in InterProDatabase.prefix_map if self.accession.startswith(prefix)),
+            None
+            )
     
     def __request(self, url: str) -> dict[str, Any]:
         '''
         Given an InterPro API url, performs a request and returns the 
-        response as a python-interactable JSON. 
+        response as a python-interactable JSON. Responses are cached on 
+        disk (see 'http_cache').
 
         Parameters
         ----------
@@ -84,8 +112,67 @@ class InterProDatabase:
         dict[str, Any]
             Parsed JSON response.
         '''
-        request = requests.get(url)
-        return request.json()
+        # Cached response
+        json = http_cache.read(url)
+        if json is not None:
+            return json
+
+        # Request to InterPro API
+        request = InterProDatabase.session.get(url, timeout = (5, 30))
+        json = utils.json_loads(request.content)
+        http_cache.write(url, json)
+        return json
+
+    async def _arequest_page(
+            self,
+            session: aiohttp.client.ClientSession,
+            url: str
+            ) -> tuple[list[str], str]:
+        '''
+        Given an InterPro API url of a page of proteins, performs an
+        asynchronous request and stream-parses the response with ijson,
+        keeping only the UniProt IDs and the url of the next page, so 
+        the memory used does not depend on the page size. Rate-limited
+        responses (429) are retried with an exponential backoff instead 
+        of sleeping a fixed amount of time between every request. Parsed
+        pages are cached on disk (see 'http_cache').
+
+        Parameters
+        ----------
+        session : aiohttp.client.ClientSession
+            Asynchronous HTTP session.
+
+        url : str
+            InterPro API url.
+
+        Returns
+        -------
+        tuple[list[str], str]
+            UniProt IDs of the page and url of the next page (None if it
+            is the last page).
+        '''
+        # Cached page
+        key = f'{url}#accessions'
+        page = http_cache.read(key)
+        if page is not None:
+            return page
+
+        # Request to InterPro API
+        for attempt in range(5):
+            async with session.get(url) as response:
+                if response.status != 429:
+                    response.raise_for_status()
+                    uniprot_ids, next_url = [], None
+                    async for prefix, event, value in ijson.parse_async(response.content):
+                        if prefix == 'results.item.metadata.accession':
+                            uniprot_ids.append(value)
+                        elif prefix == 'next' and event == 'string':
+                            next_url = value
+                    http_cache.write(key, (uniprot_ids, next_url))
+                    return uniprot_ids, next_url
+            logger.info(f'Attempt {attempt+1} with {url} was rate-limited')
+            await asyncio.sleep(2 ** attempt)
+        raise Exception(f'Error 429 in request {url}')
     
     def get_metadata(self) -> None:
         '''
@@ -108,42 +195,103 @@ class InterProDatabase:
         logger.info(f'{self.number_of_proteins=}')
         logger.info(f'{self.number_of_alphafolds=}')
 
-    def get_uniprot(self, batch_size: int = 200) -> None:
+    async def _iter_pages(self, url: str, total_batches: int) -> AsyncIterator[list[str]]:
         '''
-        Use InterPro API to retrieve necessary the UniProt IDs, taxons 
-        and domains of the proteins belonging to the self.accession 
-        InterPro ID.
+        Follows the InterPro API pagination starting from 'url' and 
+        yields the UniProt IDs of every page. InterPro uses cursor-based
+        pagination, so the pages are requested one after the other, but 
+        all of them reuse the same keep-alive connection and the next page
+        is already being requested while the current one is consumed.
+
+        Parameters
+        ----------
+        url : str
+            InterPro API url of the first page.
+
+        total_batches : int
+            Expected number of pages, used for the progress bar.
+
+        Yields
+        ------
+        list[str]
+            UniProt IDs of a page.
+        '''
+        # Shared connection pool for all pages
+        async with http.get_session() as session:
+            with tqdm(total = total_batches) as pbar:
+                next_page = asyncio.create_task(self._arequest_page(session, url))
+                try:
+                    while next_page:
+                        
+                        # Page UniProt IDs
+                        uniprot_ids, url = await next_page
+
+                        # Request the next page while the current one is consumed
+                        next_page = asyncio.create_task(self._arequest_page(session, url)) if url else None
+                        await asyncio.sleep(0)
+
+                        # Access protein info
+                        yield uniprot_ids
+                        pbar.update(1)
+                finally:
+                    # Consumer stopped early
+                    if next_page:
+                        next_page.cancel()
+
+    def iter_uniprot(self, batch_size: int = 200) -> Iterator[str]:
+        '''
+        Use InterPro API to lazily retrieve the UniProt IDs of the 
+        proteins belonging to the self.accession InterPro ID. The 
+        UniProt IDs of a page are yielded as soon as the page is parsed,
+        so memory usage does not grow with the number of proteins.
 
         Parameters
         ----------
         batch_size : int, optional
             Batch size, by default 200
-        '''
-        # Initialize list of UniProt IDs
-        uniprot_ids = []
 
+        Yields
+        ------
+        str
+            UniProt ID.
+        '''
         # InterPro API URL
         url = f'{InterProDatabase.url}/protein/uniprot/entry/{self.source_database}/{self.accession}?page_size={batch_size}'
 
         # Manage API pagination
         total_batches = math.ceil(self.number_of_proteins/batch_size)
-        with tqdm(total = total_batches) as pbar:
-            while url:
-                
-                # Page response JSON
-                json = self.__request(url)
-                for result in json['results']:
-                    
-                    # Access protein info
-                    uniprot_id = result['metadata']['accession']
-                    
-                    # Append to results list
-                    uniprot_ids.append(uniprot_id)
-
-                # Prepare for next batch
-                url = json['next']
-                pbar.update(1)
-                time.sleep(0.2)
+        pages = self._iter_pages(url, total_batches)
+
+        # Drive the asynchronous pages from this (synchronous) generator
+        loop = asyncio.new_event_loop()
+        try:
+            while True:
+                try:
+                    uniprot_ids = loop.run_until_complete(anext(pages))
+                except StopAsyncIteration:
+                    break
+                yield from uniprot_ids
+        finally:
+            loop.run_until_complete(pages.aclose())
+            loop.close()
+
+    def get_uniprot(self, batch_size: int = 200) -> list[str]:
+        '''
+        Use InterPro API to retrieve necessary the UniProt IDs, taxons 
+        and domains of the proteins belonging to the self.accession 
+        InterPro ID. See 'iter_uniprot()'.
+
+        Parameters
+        ----------
+        batch_size : int, optional
+            Batch size, by default 200
+
+        Returns
+        -------
+        list[str]
+            UniProt IDs.
+        '''
+        uniprot_ids = list(self.iter_uniprot(batch_size))
 
         # Logging
         logger.info(f'{len(uniprot_ids)} UniProt IDs retrieved for {self.accession}')
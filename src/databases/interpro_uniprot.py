@@ -13,6 +13,8 @@ Outline:    InterProUniProt class to interact with the InterPro API given an
                 'IPR002100': [(0, 50), (100, 150)],
                 'PF00319': [(60, 120)]
             }
+            The domains of many UniProt IDs can be fetched concurrently with
+            aiohttp using 'get_all_domains()'.
 Docs:       https://github.com/ProteinsWebTeam/interpro7-api
 Author:     Alejandro Sánchez Cano
 Date:       01/10/2024
@@ -20,13 +22,18 @@ Date:       01/10/2024
 """
 
 # Built-in modules
+import asyncio
 from typing import Any
 from collections import defaultdict
 
 # Third-party modules
-import requests
+import aiohttp
+from tqdm.asyncio import tqdm_asyncio
 
 # Custom modules
+from src.misc import http
+from src.misc import utils
+from src.misc import http_cache
 from src.misc.logger import logger
 
 class InterProUniProt:
@@ -45,14 +52,24 @@ class InterProUniProt:
         '''
         return str(self.__dict__)
     
-    def __request(self, url: str) -> dict[str, Any]:
+    async def _arequest(
+            self,
+            session: aiohttp.client.ClientSession,
+            url: str
+            ) -> dict[str, Any]:
         '''
-        Given an InterPro API url, performs a request and returns the 
-        response as a python-interactable JSON. Manages 200 and 204
-        status codes, raising an exception for any other status code.
+        Given an InterPro API url, performs an asynchronous request and
+        returns the response as a python-interactable JSON. Manages 200 
+        and 204 status codes, 
+        retries rate-limited (429) requests with an exponential backoff 
+        and raises an exception for any other status code. Responses are
+        cached on disk (see 'http_cache').
 
         Parameters
         ----------
+        session : aiohttp.client.ClientSession
+            Asynchronous HTTP session.
+
         url : str
             InterPro API url.
 
@@ -61,25 +78,53 @@ class InterProUniProt:
         dict[str, Any]
             Parsed JSON response.
         '''
-        request = requests.get(url)
-        status = request.status_code
-        match status:
-            case 200:
-                return request.json()
-            case 204:
-                return {}
-            case _:
-                raise Exception(f'Error {status} in request')
-    
-    def get_domains(self) -> dict[str, list[tuple[int, int]]]:
+        # Cached response
+        json = http_cache.read(url)
+        if json is not None:
+            return json
+
+        # Request to InterPro API
+        for attempt in range(5):
+            async with session.get(url) as response:
+                status = response.status
+                match status:
+                    case 200:
+                        json = utils.json_loads(await response.read())
+                        http_cache.write(url, json)
+                        return json
+                    case 204:
+                        http_cache.write(url, {})
+                        return {}
+                    case 429:
+                        logger.info(f'Attempt {attempt+1} with {self.uniprot_id} was rate-limited')
+                    case _:
+                        raise Exception(f'Error {status} in request')
+            await asyncio.sleep(2 ** attempt)
+        raise Exception(f'Error {status} in request')
+
+    async def _get_domains(
+            self,
+            session: aiohttp.client.ClientSession,
+            semaphore: asyncio.locks.Semaphore
+            ) -> dict[str, list[tuple[int, int]]]:
         '''
         Uses the InterPro API to fetch the domains of a UniProt ID in 
         the InterPro database from a series of source databases like 
-        InterPro, PFAM, etc. The response is carefully parsed and the 
-        domains are stored in a dictionary with the accession as key 
-        and a list of tuples with the start and end of the domain as 
+        InterPro, PFAM, etc. All source databases are retrieved with a 
+        single (paginated) request, and the entries of source databases
+        not considered are discarded. The response is carefully parsed 
+        and the domains are stored in a dictionary with the accession as
+        key and a list of tuples with the start and end of the domain as 
         value.
 
+        Parameters
+        ----------
+        session : aiohttp.client.ClientSession
+            Asynchronous HTTP session.
+        
+        semaphore : asyncio.locks.Semaphore
+            Semaphore to limit the number of simultaneous requests.
+
         Returns
         -------
         dict[str, list[tuple[int, int]]]
@@ -98,39 +143,105 @@ class InterProUniProt:
             'prosite', 'pfam', 'panther', 'ssf', 'hamap', 'pirsf', 'ncbifam'
             ]
         
-        # Iterate over source databases
-        for database in source_databases:
-            # Make request
-            url = f'https://www.ebi.ac.uk/interpro/api/entry/{database}/protein/uniprot/{self.uniprot_id}'
-            logger.debug(f'Processing {database}')
-            logger.debug(f'URL: {url}')
-            json = self.__request(url)
-            # Empty response
-            if not json:
-                continue
-            # Pagination not implemented
-            assert json['next'] is None, 'Pagination needs to be implemented'
-
-            # Navigate JSON response
-            for result in json['results']:
-                accession = result['metadata']['accession']
-                subdatabases = result['metadata']['member_databases']
-                subdatabases = subdatabases.keys() if subdatabases else []
-                assert all(subdatabase in source_databases for subdatabase in subdatabases), f'Unknown source database in {subdatabases} for {self.uniprot_id}'
-                assert len(result['proteins']) == 1, f'Multiple proteins found in {accession} for {self.uniprot_id}'
-                for location in result['proteins'][0]['entry_protein_locations']:
-                    for fragment in location['fragments']:
-                        
-                        # Extract domain start and end
-                        start = int(fragment['start']) - 1
-                        end = int(fragment['end']) - 1
-                        logger.debug(f'{self.uniprot_id} {result["metadata"]["accession"]} {start}-{end}')
-                        
-                        # Store domain
-                        domains[accession] += [(start, end)]
+        # Request all source databases at once (instead of one request per
+        # source database) and follow the pagination
+        url = f'https://www.ebi.ac.uk/interpro/api/entry/all/protein/uniprot/{self.uniprot_id}?page_size=200'
+        async with semaphore:
+            while url:
+                logger.debug(f'URL: {url}')
+                json = await self._arequest(session, url)
+                # Empty response
+                if not json:
+                    break
+
+                # Navigate JSON response
+                for result in json['results']:
+                    accession = result['metadata']['accession']
+                    # Discard source databases not considered
+                    if result['metadata']['source_database'] not in source_databases:
+                        continue
+                    subdatabases = result['metadata']['member_databases']
+                    subdatabases = subdatabases.keys() if subdatabases else []
+                    assert all(subdatabase in source_databases for subdatabase in subdatabases), f'Unknown source database in {subdatabases} for {self.uniprot_id}'
+                    assert len(result['proteins']) == 1, f'Multiple proteins found in {accession} for {self.uniprot_id}'
+                    for location in result['proteins'][0]['entry_protein_locations']:
+                        for fragment in location['fragments']:
+                            
+                            # Extract domain start and end
+                            start = int(fragment['start']) - 1
+                            end = int(fragment['end']) - 1
+                            logger.debug(f'{self.uniprot_id} {result["metadata"]["accession"]} {start}-{end}')
+                            
+                            # Store domain
+                            domains[accession] += [(start, end)]
+
+                # Prepare for next page
+                url = json['next']
         
         return domains
 
+    @staticmethod
+    async def _fetch_all(uniprot_ids: list[str]) -> list[dict[str, list[tuple[int, int]]]]:
+        '''
+        Fetches the domains of a list of UniProt IDs using asynchronous 
+        HTTP requests that share a single connection pool. Duplicated
+        UniProt IDs are only requested once.
+
+        Parameters
+        ----------
+        uniprot_ids : list[str]
+            List of UniProt IDs to fetch domains of.
+
+        Returns
+        -------
+        list[dict[str, list[tuple[int, int]]]]
+            Domains of each UniProt ID, in the same order.
+        '''
+        # Limit the number of simultaneous requests with a semaphore
+        semaphore = asyncio.Semaphore(8)
+
+        # Request each UniProt ID only once
+        unique_uniprot_ids = list(dict.fromkeys(uniprot_ids))
+
+        # Fetch all domains
+        async with http.get_session() as session:
+            tasks = [InterProUniProt(uniprot_id)._get_domains(session, semaphore) for uniprot_id in unique_uniprot_ids]
+            unique_domains = await tqdm_asyncio.gather(*tasks, disable = len(tasks) == 1)
+        
+        # Map domains back to the requested UniProt IDs
+        domains_of = dict(zip(unique_uniprot_ids, unique_domains))
+        return [domains_of[uniprot_id] for uniprot_id in uniprot_ids]
+
+    @staticmethod
+    def get_all_domains(uniprot_ids: list[str]) -> dict[str, dict[str, list[tuple[int, int]]]]:
+        '''
+        Fetches the InterPro domains of many UniProt IDs concurrently.
+
+        Parameters
+        ----------
+        uniprot_ids : list[str]
+            List of UniProt IDs to fetch domains of.
+
+        Returns
+        -------
+        dict[str, dict[str, list[tuple[int, int]]]]
+            Domains (see 'get_domains()') of each UniProt ID.
+        '''
+        domains = asyncio.run(InterProUniProt._fetch_all(uniprot_ids))
+        return dict(zip(uniprot_ids, domains))
+
+    def get_domains(self) -> dict[str, list[tuple[int, int]]]:
+        '''
+        Fetches the domains of self.uniprot_id. See '_get_domains()'.
+
+        Returns
+        -------
+        dict[str, list[tuple[int, int]]]
+            Dictionary with the accession as key and a list of tuples
+            with the start and end of the domain as value.
+        '''
+        return InterProUniProt.get_all_domains([self.uniprot_id])[self.uniprot_id]
+
 if __name__ == '__main__':
     '''Test class'''
     uniprot = InterProUniProt('A0A0B2NT15')
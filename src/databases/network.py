@@ -11,7 +11,6 @@ Date:       15/10/2024
 
 # Third-party modules
 import pandas as pd
-from tqdm import tqdm
 
 # Custom modules
 from src.misc import path
@@ -28,10 +27,12 @@ class Network:
             standarized: bool = True
             ):
 
-        standarized = '_standarized' if standarized else ''
+        # Standarized networks are TSV files, intermediate ones Parquet files
+        suffix = '_standarized.tsv' if standarized else '.parquet'
         version = f'_{version}' if version else ''
-        filepath = path.NETWORKS /f'{db}{version}_{type}{standarized}.tsv'
-        self.df = pd.read_csv(filepath, sep = '\t') if db and type else None
+        filepath = path.NETWORKS /f'{db}{version}_{type}{suffix}'
+        read = (lambda x: pd.read_csv(x, sep = '\t')) if standarized else pd.read_parquet
+        self.df = read(filepath) if db and type else None
 
     def __repr__(self) -> str:
         return self.df.__repr__()
@@ -52,7 +53,9 @@ class Network:
     
     def interactors(self, df: pd.DataFrame = None) -> list[Interactor]:
         '''
-        Returns a list of interactors in a network.
+        Returns a list of interactors in a network. They are taken from
+        the (cached) Interactor mapping, so no file is unpickled per 
+        interactor.
 
         Parameters
         ----------
@@ -67,48 +70,48 @@ class Network:
         '''
         df = self.df if df is None else df
         unique_interactors = set(df['A']) | set(df['B'])
-        return [Interactor(uniprot_id) for uniprot_id in unique_interactors]
+        interactors = Interactor.mapping()
+        return [interactors.get(uniprot_id) or Interactor(uniprot_id) for uniprot_id in unique_interactors]
 
     def add_negatives_per_species(self) -> None:
         '''
         Add negatives interactions per species to the network. We assume
         that the set of interactors of a species that are not listed as 
-        positive interactions are negatives interactions.
+        positive interactions are negatives interactions. The candidate
+        pairs of each species are built as a Cartesian product and the 
+        positives are discarded with a single hash-based 'isin'.
         '''
-        # Initialize dictionary to store negatives per species
-        df_negatives = {
-            'A': [],
-            'B': [],
-            'A=B': [],
-            'Species_A': [],
-            'Species_B': [],
-            'Seq_A': [],
-            'Seq_B': [],
-            'Seq': []
-        }
-
-        # Get interactors per species
-        for species in tqdm(self.species):
-            df = self.df[self.df.apply(lambda x: x['Species_A'] == species and x['Species_B'] == species, axis = 1)]
-            interactors = self.interactors(df)
-            # Add negatives
-            for int1 in interactors:
-                for int2 in interactors:
-                    name = '-'.join(sorted([int1.uniprot_id, int2.uniprot_id]))
-                    if name not in df['A=B']:
-                        df_negatives['A'].append(int1.uniprot_id)
-                        df_negatives['B'].append(int2.uniprot_id)
-                        df_negatives['A=B'].append(f'{int1.uniprot_id}={int2.uniprot_id}')
-                        df_negatives['Species_A'].append(species)
-                        df_negatives['Species_B'].append(species)
-                        df_negatives['Seq_A'].append(int1.seq)
-                        df_negatives['Seq_B'].append(int2.seq)
-                        df_negatives['Seq'].append(f'{int1.seq}:{int2.seq}')
+        # Positive interactions within the same species
+        same_species = self.df[self.df['Species_A'] == self.df['Species_B']]
+        positives = set(same_species['A=B'])
+
+        # Sequences of the interactors, loaded once
+        seqs = {interactor.uniprot_id: interactor.seq for interactor in self.interactors(same_species)}
+
+        # All pairs of interactors per species (A <= B, like 'A=B')
+        pairs = []
+        for species, df in same_species.groupby('Species_A'):
+            uniprot_ids = sorted(set(df['A']) | set(df['B']))
+            cartesian = pd.MultiIndex.from_product([uniprot_ids, uniprot_ids], names = ['A', 'B']).to_frame(index = False)
+            cartesian = cartesian[cartesian['A'] <= cartesian['B']]
+            cartesian['Species_A'] = species
+            cartesian['Species_B'] = species
+            pairs.append(cartesian)
+        columns = ['A', 'B', 'Species_A', 'Species_B']
+        df_negatives = pd.concat(pairs, ignore_index = True) if pairs else pd.DataFrame(columns = columns)
+
+        # Negatives are the pairs that are not positives
+        df_negatives['A=B'] = df_negatives['A'] + '=' + df_negatives['B']
+        df_negatives = df_negatives[~df_negatives['A=B'].isin(positives)].assign(
+            Seq_A = lambda x: x['A'].map(seqs),
+            Seq_B = lambda x: x['B'].map(seqs),
+            Seq = lambda x: x['Seq_A'] + ':' + x['Seq_B']
+            )
+        df_negatives = df_negatives[['A', 'B', 'A=B', 'Species_A', 'Species_B', 'Seq_A', 'Seq_B', 'Seq']]
         
         # Add interaction column
         self.df['Interaction'] = 1
-        df_negatives = pd.DataFrame(df_negatives)
-        df_negatives['Interaction'] = 0
+        df_negatives = df_negatives.assign(Interaction = 0)
 
         # Add negatives to the dataframe
         df = pd.concat([self.df, df_negatives], ignore_index = True)
@@ -140,6 +143,9 @@ class Network:
         # Merge networks
         network = cls()
         df = pd.concat([network.df for network in networks], ignore_index = True)
+
+        # Remove duplicates (Arrow-backed strings hash faster)
+        df = df.astype({'A=B': 'string[pyarrow]', 'Seq': 'string[pyarrow]'})
         network.df = df.drop_duplicates('A=B')
         network.df = network.df.drop_duplicates('Seq')
 
@@ -13,16 +13,22 @@ Date:       17/10/2024
 """
 
 # Built-in modules
+import io
+import random
 import asyncio
+import concurrent.futures
 
 # Third-party modules
 import bs4
 import aiohttp
+import numpy as np
 import pandas as pd
 from tqdm.asyncio import tqdm_asyncio
 
 # Custom modules
 from src.misc import path
+from src.misc import http
+from src.misc import http_cache
 from src.misc.logger import logger
 from src.entities.interactor import Interactor
 
@@ -40,7 +46,12 @@ class PlaPPISite:
         an asynchronous HTTP request. 
         A limit amoount of attemps is set to avoid the error 
         "aiohttp.client_exceptions.ServerDisconnectedError" due to momentary
-        server disconnections. 
+        server disconnections. Attempts are spaced with an exponential 
+        backoff with jitter (or the 'Retry-After' header of 429/503 
+        responses) to avoid retrying all at once. Only valid (200) responses
+        are cached on disk (see 'http_cache'); server errors are retried, and
+        client errors and exhausted attempts return an empty string, which
+        is parsed as an empty table.
 
         Parameters
         ----------
@@ -58,21 +69,52 @@ class PlaPPISite:
         str
             Web content of the UniProt ID.
         '''
+        # Cached response
         url = f'http://zzdlab.com/plappisite/single_idmap.php?protein={uniprot_id}'
-        async with semaphore:
-            for attempt in range(3):
+        text = http_cache.read(url)
+        if text is not None:
+            return text
+
+        # Request to PlaPPISite
+        for attempt in range(5):
+            delay = min(30, 0.5 * 2 ** attempt) + random.uniform(0, 0.5)
+            async with semaphore:
                 try:
                     async with session.get(url) as response:
-                        return await response.text()
+                        # Valid page -> cache it
+                        if response.status == 200:
+                            text = await response.text()
+                            http_cache.write(url, text)
+                            return text
+                        # Overloaded server -> wait as long as requested (up to 30 s)
+                        elif response.status in (429, 503):
+                            retry_after = response.headers.get('Retry-After', '')
+                            delay = min(30, float(retry_after)) if retry_after.isdigit() else delay
+                            logger.info(f"Attempt {attempt+1} with {uniprot_id} failed: {response.status}")
+                        # Server error -> retry with backoff
+                        elif response.status >= 500:
+                            logger.info(f"Attempt {attempt+1} with {uniprot_id} failed: {response.status}")
+                        # Client error -> not retried nor cached
+                        else:
+                            logger.error(f"Request with {uniprot_id} failed: {response.status}")
+                            return ''
                 except (aiohttp.ClientError, asyncio.TimeoutError) as e:
                     logger.info(f"Attempt {attempt+1} with {uniprot_id} failed: {e}")
-                    await asyncio.sleep(2)
+            
+            # Back off outside the semaphore to free the slot for others
+            if attempt < 4:
+                await asyncio.sleep(delay)
+
+        # All attempts failed -> empty (uncached) content
+        logger.error(f"Request with {uniprot_id} failed after {attempt+1} attempts")
+        return ''
 
     async def _fetch_all(self, uniprot_ids: list[str]) -> list[str]:
         '''
         Fetches the web text content of a list of UniProt IDs from 
         PlaPPISite using asynchronous HTTP requests because to process
-        18K UniProt IDs sequencially could take +8h.
+        18K UniProt IDs sequencially could take +8h. Duplicated UniProt
+        IDs are only requested once.
 
         Parameters
         ----------
@@ -87,24 +129,34 @@ class PlaPPISite:
         # Limit the number of simultaneous requests with a semaphore
         semaphore = asyncio.Semaphore(100)
 
+        # Request each UniProt ID only once
+        unique_uniprot_ids = list(dict.fromkeys(uniprot_ids))
+
         # Fetch all responses
-        async with aiohttp.ClientSession() as session:
-            tasks = [self._fetch(session, semaphore, uniprot_id) for uniprot_id in uniprot_ids]
-            responses = await tqdm_asyncio.gather(*tasks)
+        async with http.get_session() as session:
+            tasks = [self._fetch(session, semaphore, uniprot_id) for uniprot_id in unique_uniprot_ids]
+            unique_responses = await tqdm_asyncio.gather(*tasks)
+
+        # Map responses back to the requested UniProt IDs
+        response_of = dict(zip(unique_uniprot_ids, unique_responses))
+        responses = [response_of[uniprot_id] for uniprot_id in uniprot_ids]
     
         # Logging
         logger.info(f'PlaPPISite -> Retrieved {len(responses)} responses')
 
         return responses
 
-    def _get_table(self, soup: bs4.BeautifulSoup) -> pd.DataFrame:
+    def _get_table(self, response: str) -> pd.DataFrame:
         '''
         Parses the web content of an accession and retrieves the PPI 
-        table.
+        table. Only the table container is parsed by BeautifulSoup, and 
+        the table is converted to a DataFrame by pandas (lxml). All the 
+        cells are kept as strings. Empty web contents (failed requests) or
+        contents without the table container give an empty table.
 
         Parameters
         ----------
-        soup : bs4.BeautifulSoup
+        response : str
             Accession's web content.
 
         Returns
@@ -112,12 +164,38 @@ class PlaPPISite:
         pd.DataFrame
             Interaction table.
         '''
-        table = soup.find('div', attrs = {'id':'container_table'})
-        columns = [th.text for th in table.find_all('th')]
-        tds = [td.text for td in table.find_all('td')]
-        rows = [tds[i : i + len(columns)] for i in range(0, len(tds), len(columns))]
+        # No web content (failed request) -> empty table
+        if not response:
+            return pd.DataFrame(columns = ['PPI source'])
+
+        # No table container (e.g. error page) -> empty table
+        strainer = bs4.SoupStrainer('div', attrs = {'id':'container_table'})
+        table = bs4.BeautifulSoup(response, features = 'lxml', parse_only = strainer)
+        if table.find('table') is None:
+            return pd.DataFrame(columns = ['PPI source'])
+
+        table = pd.read_html(io.StringIO(str(table)), flavor = 'lxml', keep_default_na = False)[0]
+
+        return table.astype(str)
+
+    def _get_non_predicted_table(self, response: str) -> pd.DataFrame:
+        '''
+        Retrieves the PPI table of an accession's web content and removes
+        the predicted PPIs. Runs in the worker processes of 
+        'mads_vs_all()'.
 
-        return pd.DataFrame(rows, columns = columns)
+        Parameters
+        ----------
+        response : str
+            Accession's web content.
+
+        Returns
+        -------
+        pd.DataFrame
+            Non-predicted interaction table.
+        '''
+        table = self._get_table(response)
+        return table[~table['PPI source'].isin(['Predicted', 'prediction'])]
 
     def mads_vs_all(self) -> None:
         '''
@@ -133,24 +211,21 @@ class PlaPPISite:
         best source of predicted PPIs, so PlaPPISite predicted PPIs will 
         not be likely used.
         '''
-        # Initialize DataFrame
-        mads_vs_all = pd.DataFrame()
-
         # Retrieve non-predicted PPI table of all MADS proteins
-        uniprot_ids = [interactor.uniprot_id for interactor in Interactor.iterate()]
+        uniprot_ids = list(Interactor.mapping())
         responses = asyncio.run(self._fetch_all(uniprot_ids))
-        soups = [bs4.BeautifulSoup(response, features = 'lxml') for response in responses]
-        tables = [self._get_table(soup) for soup in soups]
-        non_predicted_tables = [table[table['PPI source'].apply(lambda x: x not in ['Predicted', 'prediction'])] for table in tables]
-
-        # Append to DataFrame if not empty (non-predicted PPIs)
-        for non_predicted_table in non_predicted_tables:
-            if not non_predicted_table.empty:
-                mads_vs_all = pd.concat([mads_vs_all, non_predicted_table], ignore_index = True)
+
+        # Parse the web contents on all cores (HTML parsing is CPU-bound)
+        with concurrent.futures.ProcessPoolExecutor() as executor:
+            non_predicted_tables = list(executor.map(self._get_non_predicted_table, responses, chunksize = 64))
+
+        # Concatenate once the non-empty tables (non-predicted PPIs)
+        non_empty_tables = [table for table in non_predicted_tables if not table.empty]
+        mads_vs_all = pd.concat(non_empty_tables, ignore_index = True) if non_empty_tables else pd.DataFrame()
         
         # Save DataFrame
-        file_path = path.NETWORKS / 'PlaPPISite_MADS_vs_ALL.tsv'
-        mads_vs_all.to_csv(file_path, sep = '\t', index = False)
+        file_path = path.NETWORKS / 'PlaPPISite_MADS_vs_ALL.parquet'
+        mads_vs_all.to_parquet(file_path, compression = 'zstd', index = False)
 
         # Logging
         logger.info(f'MADS vs. all PPIs in PlaPPISite -> dim({mads_vs_all.shape})')
@@ -160,19 +235,21 @@ class PlaPPISite:
         Filters MADS vs. MADS interactions from the MADS vs. ALL
         '''
         # Load MADS_vs_ALL DataFrame
-        filepath = path.NETWORKS / 'PlaPPISite_MADS_vs_ALL.tsv'
-        mads_vs_all = pd.read_csv(filepath, sep = '\t')
+        filepath = path.NETWORKS / 'PlaPPISite_MADS_vs_ALL.parquet'
+        mads_vs_all = pd.read_parquet(filepath)
 
         # MADS UniProt IDs
-        mads = set([interactor.uniprot_id for interactor in Interactor.iterate()])
+        mads = set(Interactor.mapping())
 
-        # Filter MADS vs. ALL DataFrame
-        is_there_mikc = lambda x: set(x.split(' - ')).issubset(mads)
-        mads_vs_mads = mads_vs_all[mads_vs_all['PPI'].apply(is_there_mikc)]
+        # Filter MADS vs. ALL DataFrame (single-ID PPIs are homodimers)
+        interactors = mads_vs_all['PPI'].str.split(' - ', n = 1, expand = True).reindex(columns = [0, 1])
+        interactors[1] = interactors[1].fillna(interactors[0])
+        is_there_mikc = interactors[0].isin(mads) & interactors[1].isin(mads)
+        mads_vs_mads = mads_vs_all[is_there_mikc]
 
         # Save DataFrame
-        filepath = path.NETWORKS / 'PlaPPISite_MADS_vs_MADS.tsv'
-        mads_vs_mads.to_csv(filepath, sep = '\t', index = False)
+        filepath = path.NETWORKS / 'PlaPPISite_MADS_vs_MADS.parquet'
+        mads_vs_mads.to_parquet(filepath, compression = 'zstd', index = False)
 
         # Logging
         logger.info(f'MADS vs. MADS PPIs in PlaPPISite -> dim({mads_vs_mads.shape})')
@@ -192,20 +269,30 @@ class PlaPPISite:
         - Seq: Sequence of interactor A : sequence of interactor B
         '''
         # Load MADS_vs_MADS DataFrame
-        filepath = path.NETWORKS / 'PlaPPISite_MADS_vs_MADS.tsv'
-        mads_vs_mads = pd.read_csv(filepath, sep = '\t')
-
-        # Assign columns
-        mads_vs_mads['A'] = mads_vs_mads['PPI'].apply(lambda x: x.split(' - ')[0])
-        mads_vs_mads['B'] = mads_vs_mads['PPI'].apply(lambda x: x.split(' - ')[1])
-        mads_vs_mads['A=B'] = mads_vs_mads[['A', 'B']].apply(lambda x: '='.join(sorted(x)), axis = 1)
-        mads_vs_mads['Species_A'] = mads_vs_mads['A'].apply(lambda x: Interactor(x).taxon_id)
-        mads_vs_mads['Species_B'] = mads_vs_mads['B'].apply(lambda x: Interactor(x).taxon_id)
-        mads_vs_mads['Seq_A'] = mads_vs_mads['A'].apply(lambda x: Interactor(x).seq)
-        mads_vs_mads['Seq_B'] = mads_vs_mads['B'].apply(lambda x: Interactor(x).seq)
+        filepath = path.NETWORKS / 'PlaPPISite_MADS_vs_MADS.parquet'
+        mads_vs_mads = pd.read_parquet(filepath)
+
+        # Lookup tables of the interactors (one Interactor per UniProt ID)
+        interactors = Interactor.mapping()
+        taxon_ids = {uniprot_id: interactor.taxon_id for uniprot_id, interactor in interactors.items()}
+        seqs = {uniprot_id: interactor.seq for uniprot_id, interactor in interactors.items()}
+
+        # Assign columns (single-ID PPIs are homodimers)
+        uniprot_ids = mads_vs_mads['PPI'].str.split(' - ', n = 1, expand = True).reindex(columns = [0, 1])
+        mads_vs_mads['A'] = uniprot_ids[0]
+        mads_vs_mads['B'] = uniprot_ids[1].fillna(uniprot_ids[0])
+        is_sorted = mads_vs_mads['A'] <= mads_vs_mads['B']
+        A_B = mads_vs_mads['A'] + '=' + mads_vs_mads['B']
+        B_A = mads_vs_mads['B'] + '=' + mads_vs_mads['A']
+        mads_vs_mads['A=B'] = np.where(is_sorted, A_B, B_A)
+        mads_vs_mads['Species_A'] = mads_vs_mads['A'].map(taxon_ids)
+        mads_vs_mads['Species_B'] = mads_vs_mads['B'].map(taxon_ids)
+        mads_vs_mads['Seq_A'] = mads_vs_mads['A'].map(seqs)
+        mads_vs_mads['Seq_B'] = mads_vs_mads['B'].map(seqs)
         mads_vs_mads['Seq'] = mads_vs_mads['Seq_A'] + ':' + mads_vs_mads['Seq_B']
                                                                          
-        # Remove duplicated columns
+        # Remove duplicated columns (Arrow-backed strings hash faster)
+        mads_vs_mads = mads_vs_mads.astype({'A=B': 'string[pyarrow]', 'Seq': 'string[pyarrow]'})
         mads_vs_mads = mads_vs_mads.drop_duplicates('A=B')
         mads_vs_mads = mads_vs_mads.drop_duplicates('Seq')
 
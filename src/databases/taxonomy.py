@@ -0,0 +1,61 @@
+"""
+===============================================================================
+Title:      Taxonomy
+Outline:    Retrieves the NCBI taxon IDs of all the descendants of 
+            Viridiplantae (33090), so that plant interactors can be found 
+            with a set lookup instead of walking the NCBI taxonomy for each 
+            taxon ID. The taxon IDs are computed once with multitax and 
+            pickled in the DATABASES folder, avoiding to download and load 
+            the NCBI taxonomy again.
+Docs:       https://github.com/pirovc/multitax
+Author:     Alejandro Sánchez Cano
+Date:       16/10/2026
+===============================================================================
+"""
+
+# Third-party modules
+from multitax import NcbiTx
+
+# Custom modules
+from src.misc import path
+from src.misc import utils
+from src.misc.logger import logger
+
+def viridiplantae_taxon_ids() -> set[str]:
+    '''
+    Returns the NCBI taxon IDs of Viridiplantae and all its descendants.
+    They are unpickled if already computed, otherwise the NCBI taxonomy
+    is traversed from Viridiplantae (33090) and the result is pickled.
+
+    Returns
+    -------
+    set[str]
+        NCBI taxon IDs of Viridiplantae.
+    '''
+    # Already computed
+    try:
+        return utils.unpickle(path.VIRIDIPLANTAE)
+    
+    # Traverse NCBI taxonomy from Viridiplantae
+    except FileNotFoundError:
+        ncbi_tx = NcbiTx()
+        taxon_ids = set()
+        queue = ['33090']
+        while queue:
+            taxon_id = queue.pop()
+            taxon_ids.add(taxon_id)
+            queue.extend(ncbi_tx.children(taxon_id))
+
+        # Save taxon IDs
+        path.VIRIDIPLANTAE.parent.mkdir(parents=True, exist_ok=True)
+        utils.pickle(data = taxon_ids, path = path.VIRIDIPLANTAE)
+
+        # Logging
+        logger.info(f'{len(taxon_ids)} Viridiplantae taxon IDs retrieved')
+
+        return taxon_ids
+
+if __name__ == '__main__':
+    '''Test function'''
+    taxon_ids = viridiplantae_taxon_ids()
+    print('3702' in taxon_ids, '9606' in taxon_ids)
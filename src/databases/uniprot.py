@@ -3,20 +3,34 @@
 Title:      UniProt API
 Outline:    UniProt class to use the bioservices UniProt API to fetch the
             sequence, structure, and metadata (taxon ID, TrEMBL/Swiss-Prot,
-            primary, and secondary accession) of a UniProt ID.
+            primary, and secondary accession) of a UniProt ID. The metadata
+            and sequences of many UniProt IDs can be fetched in batches with
+            the UniProt REST API. Responses are cached on disk (see 
+            src/misc/http_cache.py).
 Docs:       https://bioservices.readthedocs.io/en/main/references.html#bioservices.uniprot.UniProt
+            https://www.uniprot.org/help/api_retrieve_entries
 Author:     Alejandro Sánchez Cano
 Date:       03/10/2025
 ===============================================================================
 """
 
 # Built-in modules
-import subprocess
+import asyncio
+from typing import Any
 
 # Third-party modules
+import aiohttp
+import requests
+from tqdm import tqdm
+from tqdm.asyncio import tqdm_asyncio
+from urllib3.util import Retry
+from requests.adapters import HTTPAdapter
 from bioservices.uniprot import UniProt as UniProtAPI
 
 # Custom modules
+from src.misc import http
+from src.misc import utils
+from src.misc import http_cache
 from src.misc.logger import logger
 
 class UniProtError(Exception):
@@ -27,6 +41,16 @@ class UniProt:
 
     # Initialize UniProt API
     uniprot_api = UniProtAPI(verbose = False)
+    rest_url = 'https://rest.uniprot.org/uniprotkb'
+    alphafold_url = 'https://alphafold.ebi.ac.uk/files/AF-{}-F1-model_v4.pdb'
+
+    # HTTP session that reuses UniProt/AlphaFold connections across requests
+    session = requests.Session()
+    session.mount('https://', HTTPAdapter(
+        pool_connections = 20,
+        pool_maxsize = 20,
+        max_retries = Retry(total = 3, backoff_factor = 0.3)
+        ))
 
     def __init__(self, uniprot_id: str):
         self.uniprot_id = uniprot_id
@@ -45,27 +69,105 @@ class UniProt:
             Taxon ID, section, primary accession, and secondary accessions.
         '''
 
-        # Use UniProt API
-        entry_json = UniProt.uniprot_api.retrieve(
-            uniprot_id = self.uniprot_id,
-            frmt = 'json',
-            database = 'uniprot'
-            )
+        # Use UniProt API (or cached response)
+        key = f'uniprot/retrieve/{self.uniprot_id}.json'
+        entry_json = http_cache.read(key)
+        if entry_json is None:
+            entry_json = UniProt.uniprot_api.retrieve(
+                uniprot_id = self.uniprot_id,
+                frmt = 'json',
+                database = 'uniprot'
+                )
+            http_cache.write(key, entry_json)
 
         # Handle inactice UniProt IDs
         if entry_json['entryType'] == 'Inactive':
             raise UniProtError(f'{self.uniprot_id} is an inactive UniProt ID')
 
         # Parse metadata
+        metadata = UniProt._parse_metadata(entry_json)
+
+        # Logging
+        logger.debug(f'Metadata fetched for {self.uniprot_id}')
+
+        return metadata
+
+    @staticmethod
+    def _parse_metadata(entry_json: dict[str, Any]) -> tuple[int, str, str, str]:
+        '''
+        Parses the metadata of a UniProt entry in JSON format.
+
+        Parameters
+        ----------
+        entry_json : dict[str, Any]
+            UniProt entry.
+
+        Returns
+        -------
+        tuple[int, str, str, str]
+            Taxon ID, section, primary accession, and secondary accessions.
+        '''
         taxon_id = int(entry_json['organism']['taxonId'])
         section = 'TrEMBL' if entry_json['entryType'].endswith('(TrEMBL)') else 'Swiss-Prot'
         primary_accession = entry_json.get('primaryAccession', '')
         secondary_accession = entry_json.get('secondaryAccessions', [])
 
+        return taxon_id, section, primary_accession, secondary_accession
+
+    @classmethod
+    def fetch_batch(
+            cls, 
+            uniprot_ids: list[str], 
+            batch_size: int = 100
+            ) -> dict[str, tuple[int, str, str, str, str]]:
+        '''
+        Fetches the metadata and the sequence of many UniProt IDs with the
+        UniProt REST 'accessions' endpoint, which returns up to 
+        'batch_size' entries per request instead of one request per 
+        UniProt ID and per data type. Inactive UniProt IDs are not 
+        included in the result.
+
+        Parameters
+        ----------
+        uniprot_ids : list[str]
+            UniProt IDs.
+        batch_size : int, optional
+            Number of UniProt IDs per request, by default 100.
+
+        Returns
+        -------
+        dict[str, tuple[int, str, str, str, str]]
+            Taxon ID, section, primary accession, secondary accessions
+            and sequence of each active UniProt ID.
+        '''
+        entries = {}
+        for i in tqdm(range(0, len(uniprot_ids), batch_size)):
+            batch = uniprot_ids[i : i + batch_size]
+
+            # Use UniProt REST API (or cached response)
+            url = f'{cls.rest_url}/accessions?accessions={",".join(batch)}&format=json&size={batch_size}'
+            results = http_cache.read(url)
+            if results is None:
+                response = cls.session.get(url, timeout = 60)
+                response.raise_for_status()
+                results = utils.json_loads(response.content)['results']
+                http_cache.write(url, results)
+
+            # Parse entries (requested IDs may be secondary accessions)
+            requested = set(batch)
+            for entry_json in results:
+                if entry_json['entryType'] == 'Inactive':
+                    continue
+                metadata = cls._parse_metadata(entry_json)
+                sequence = entry_json['sequence']['value']
+                accessions = [entry_json['primaryAccession'], *entry_json.get('secondaryAccessions', [])]
+                for uniprot_id in requested.intersection(accessions):
+                    entries[uniprot_id] = (*metadata, sequence)
+
         # Logging
-        logger.debug(f'Metadata fetched for {self.uniprot_id}')
+        logger.info(f'{len(entries)}/{len(uniprot_ids)} UniProt entries fetched')
 
-        return taxon_id, section, primary_accession, secondary_accession
+        return entries
     
     def fetch_sequence(self) -> str:
         '''
@@ -78,8 +180,12 @@ class UniProt:
         str
             Sequence of the UniProt ID.
         '''
-        # Fetch sequence
-        fasta = UniProt.uniprot_api.get_fasta(self.uniprot_id)
+        # Fetch sequence (or cached response)
+        key = f'uniprot/get_fasta/{self.uniprot_id}'
+        fasta = http_cache.read(key)
+        if fasta is None:
+            fasta = UniProt.uniprot_api.get_fasta(self.uniprot_id)
+            http_cache.write(key, fasta)
         sequence = fasta.split('\n', 1)[1].replace('\n', '')
 
         # Logging
@@ -96,16 +202,110 @@ class UniProt:
         str
             Structure of the UniProt ID.
         '''
+        # Cached structure
+        url = UniProt.alphafold_url.format(self.uniprot_id)
+        structure = http_cache.read(url)
+        if structure is not None:
+            return structure
+
         # Download structure
-        cmd = f'curl "https://alphafold.ebi.ac.uk/files/AF-{self.uniprot_id}-F1-model_v4.pdb"'
-        response = subprocess.run(cmd, capture_output = True, text = True, shell = True).stdout
-        status = 404 if response.endswith('</Error>') else 200
+        response = UniProt.session.get(url, timeout = 60)
+        status = response.status_code
 
         # Logging
         logger.debug(f'Structure fetched for {self.uniprot_id}')
 
         # Only save the non-empty responses (> 200 characters)
-        return response if status == 200 else ''
+        structure = response.text if status == 200 else ''
+        if status in (200, 404):
+            http_cache.write(url, structure)
+        return structure
+
+    async def _fetch_structure(
+            self,
+            session: aiohttp.client.ClientSession,
+            semaphore: asyncio.locks.Semaphore
+            ) -> str:
+        '''
+        Asynchronous version of 'fetch_structure()'.
+
+        Parameters
+        ----------
+        session : aiohttp.client.ClientSession
+            Asynchronous HTTP session.
+        
+        semaphore : asyncio.locks.Semaphore
+            Semaphore to limit the number of simultaneous requests.
+
+        Returns
+        -------
+        str
+            Structure of the UniProt ID.
+        '''
+        # Cached structure
+        url = UniProt.alphafold_url.format(self.uniprot_id)
+        structure = http_cache.read(url)
+        if structure is not None:
+            return structure
+
+        # Download structure
+        async with semaphore:
+            async with session.get(url) as response:
+                status = response.status
+                structure = await response.text() if status == 200 else ''
+
+        # Logging
+        logger.debug(f'Structure fetched for {self.uniprot_id}')
+
+        # Only cache definitive answers (found or not found)
+        if status in (200, 404):
+            http_cache.write(url, structure)
+        return structure
+
+    @staticmethod
+    async def _fetch_structures(uniprot_ids: list[str]) -> list[str]:
+        '''
+        Downloads the structures of a list of UniProt IDs using 
+        asynchronous HTTP requests that share a single connection pool.
+
+        Parameters
+        ----------
+        uniprot_ids : list[str]
+            UniProt IDs.
+
+        Returns
+        -------
+        list[str]
+            Structures of the UniProt IDs, in the same order.
+        '''
+        # Limit the number of simultaneous requests with a semaphore
+        semaphore = asyncio.Semaphore(16)
+
+        # Fetch all structures
+        async with http.get_session() as session:
+            tasks = [UniProt(uniprot_id)._fetch_structure(session, semaphore) for uniprot_id in uniprot_ids]
+            structures = await tqdm_asyncio.gather(*tasks)
+
+        return structures
+
+    @staticmethod
+    def fetch_structures(uniprot_ids: list[str]) -> dict[str, str]:
+        '''
+        Downloads the structures of many UniProt IDs concurrently from 
+        the AlphaFold Protein Structure Database.
+
+        Parameters
+        ----------
+        uniprot_ids : list[str]
+            UniProt IDs.
+
+        Returns
+        -------
+        dict[str, str]
+            Structure of each UniProt ID ('' if there is none).
+        '''
+        structures = asyncio.run(UniProt._fetch_structures(uniprot_ids))
+        return dict(zip(uniprot_ids, structures))
 
 if __name__ == '__main__':
     '''Test class'''
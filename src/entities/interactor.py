@@ -5,6 +5,12 @@ Outline:    Interactor class to store MIKC protein information before building
             the final protein-protein interaction network. It uses the 
             UniProt ID as the unique identifier and stores metadata obtained
             from UniProt as a pickled .int file in the INTERACTORS folder. 
+            All Interactor objects are also indexed in a single pickled file
+            (INTERACTORS_INDEX) to load them at once, which is removed every
+            time an Interactor object is pickled to avoid stale data. They
+            can also be packed in a single memory-mapped archive 
+            (INTERACTORS_ARCHIVE) so that instantiating a single Interactor
+            object does not need to open its own file.
             It stores:
             - Uniprot ID
             - Domains: {'IPR002100':[(0,20), (30,50)], 'IPR003000':[(60,80)]}
@@ -20,8 +26,13 @@ Date:       02/10/2024
 """
 
 # Built-in modules
+import os
+import mmap
 import pprint
-from typing import Generator
+import struct
+import pickle as pkl
+from functools import cache
+from typing import Any, Generator
 
 # Third-party modules
 from tqdm import tqdm
@@ -34,9 +45,9 @@ from src.misc import utils
 class Interactor:
 
     def __init__(self, uniprot_id: str):
-        # Instantiate from folder (from __dict__)
+        # Instantiate from archive or folder (from __dict__)
         try:
-            __dict__ = utils.unpickle(path.INTERACTORS / f'{uniprot_id}.int')
+            __dict__ = Interactor._load(uniprot_id)
             for attribute, value in __dict__.items():
                 setattr(self, attribute, value)
         
@@ -70,6 +81,116 @@ class Interactor:
         '''
         filepath = path.INTERACTORS / f'{self.uniprot_id}.int'
         utils.pickle(data = self.__dict__, path = filepath)
+        path.INTERACTORS_INDEX.unlink(missing_ok = True)
+        path.INTERACTORS_ARCHIVE.unlink(missing_ok = True)
+        Interactor._archive.cache_clear()
+        Interactor.mapping.cache_clear()
+
+    @staticmethod
+    def _load(uniprot_id: str) -> dict[str, Any]:
+        '''
+        Retrieves the __dict__ of an Interactor object from the 
+        INTERACTORS_ARCHIVE file if it is there (no file is opened, the 
+        pickled __dict__ is read from the memory-mapped archive), or from
+        its file in the INTERACTORS folder otherwise.
+
+        Parameters
+        ----------
+        uniprot_id : str
+            UniProt ID.
+
+        Returns
+        -------
+        dict[str, Any]
+            Instance attributes.
+
+        Raises
+        ------
+        FileNotFoundError
+            If the Interactor object has not been pickled.
+        '''
+        archive = Interactor._archive()
+        if archive is not None and uniprot_id in archive[1]:
+            mapped, offsets = archive
+            offset, size = offsets[uniprot_id]
+            return pkl.loads(mapped[offset : offset + size])
+        return utils.unpickle(path.INTERACTORS / f'{uniprot_id}.int')
+
+    @staticmethod
+    @cache
+    def _archive() -> tuple[mmap.mmap, dict[str, tuple[int, int]]] | None:
+        '''
+        Memory-maps the INTERACTORS_ARCHIVE file and reads its offset 
+        table. It is cached, so the archive is only opened once per run
+        (until an Interactor object is pickled).
+
+        Returns
+        -------
+        tuple[mmap.mmap, dict[str, tuple[int, int]]] | None
+            Memory-mapped archive and UniProt ID to (offset, size) of the
+            pickled __dict__ mapping, or None if there is no archive.
+        '''
+        try:
+            with open(path.INTERACTORS_ARCHIVE, 'rb') as handle:
+                mapped = mmap.mmap(handle.fileno(), 0, access = mmap.ACCESS_READ)
+        except FileNotFoundError:
+            return None
+        
+        # Offset table is at the end of the archive
+        end = len(mapped) - 8
+        size, = struct.unpack_from('<Q', mapped, end)
+        offsets = pkl.loads(mapped[end - size : end])
+        return mapped, offsets
+
+    @staticmethod
+    def build_archive() -> None:
+        '''
+        Writes the __dict__ of all Interactor objects in the INTERACTORS
+        folder to a single INTERACTORS_ARCHIVE file, so that instantiating
+        an Interactor object does not need to open its own file. The 
+        pickled __dict__ objects are written one after the other, followed
+        by the pickled table of their offsets and sizes and by the size of
+        the table (8 bytes).
+        '''
+        offsets, offset = {}, 0
+        tmp_filepath = path.INTERACTORS_ARCHIVE.with_suffix('.tmp')
+        with open(tmp_filepath, 'wb') as handle:
+            # Pickled __dict__ objects
+            for file in tqdm(list(path.INTERACTORS.glob('*.int'))):
+                record = pkl.dumps(utils.unpickle(file), protocol = pkl.HIGHEST_PROTOCOL)
+                handle.write(record)
+                offsets[file.stem] = (offset, len(record))
+                offset += len(record)
+            
+            # Offset table
+            table = pkl.dumps(offsets, protocol = pkl.HIGHEST_PROTOCOL)
+            handle.write(table)
+            handle.write(struct.pack('<Q', len(table)))
+        
+        # Replace archive
+        tmp_filepath.replace(path.INTERACTORS_ARCHIVE)
+        Interactor._archive.cache_clear()
+
+    @staticmethod
+    def _from_dict(__dict__: dict[str, Any]) -> 'Interactor':
+        '''
+        Instantiates an Interactor object from its __dict__ without 
+        reading its file in the INTERACTORS folder.
+
+        Parameters
+        ----------
+        __dict__ : dict[str, Any]
+            Instance attributes.
+
+        Returns
+        -------
+        Interactor
+            Interactor object.
+        '''
+        interactor = object.__new__(Interactor)
+        for attribute, value in __dict__.items():
+            setattr(interactor, attribute, value)
+        return interactor
     
     @staticmethod
     def iterate() -> Generator['Interactor', None, None]:
@@ -81,9 +202,36 @@ class Interactor:
         Interactor
             Interactor object.
         '''
-        total = len(list(path.INTERACTORS.glob('*')))
-        for file in tqdm(path.INTERACTORS.iterdir(), total = total):
-            yield Interactor(file.stem)
+        files = [entry.name for entry in os.scandir(path.INTERACTORS)]
+        for file in tqdm(files):
+            yield Interactor(os.path.splitext(file)[0])
+
+    @staticmethod
+    @cache
+    def mapping() -> dict[str, 'Interactor']:
+        '''
+        Maps the UniProt IDs to the Interactor objects in the INTERACTORS
+        folder. The mapping is cached, so the folder is only unpickled
+        once per run (until an Interactor object is pickled) no matter 
+        how many times it is requested. It is
+        loaded from the INTERACTORS_INDEX file with a single read, which
+        is built from the INTERACTORS folder if it does not exist.
+
+        Returns
+        -------
+        dict[str, Interactor]
+            UniProt ID to Interactor object mapping.
+        '''
+        # Load index of all Interactor objects
+        try:
+            __dicts__ = utils.unpickle(path.INTERACTORS_INDEX)
+
+        # Build index from the INTERACTORS folder
+        except FileNotFoundError:
+            __dicts__ = {interactor.uniprot_id: interactor.__dict__ for interactor in Interactor.iterate()}
+            utils.pickle(data = __dicts__, path = path.INTERACTORS_INDEX)
+
+        return {uniprot_id: Interactor._from_dict(__dict__) for uniprot_id, __dict__ in __dicts__.items()}
     
 if __name__ == '__main__':
     '''Test class'''
@@ -13,11 +13,14 @@ Date:       30/06/2025
 """
 
 # Built-in imports
+from functools import cached_property
 from string import ascii_uppercase, ascii_lowercase
 
 # Third party imports
 import numpy as np
 import matplotlib.pyplot as plt
+from matplotlib.axes import Axes
+from matplotlib.figure import Figure
 
 class Map:
 
@@ -38,7 +41,19 @@ class Map:
         '''
         return len(self.matrix)
 
-    def pad(self, max_size: int) -> 'Map':
+    @cached_property
+    def max_value(self) -> float:
+        '''
+        Maximum value of the map matrix, computed once per Map.
+
+        Returns
+        -------
+        float
+            Maximum value of the map matrix.
+        '''
+        return self.matrix.max()
+
+    def pad(self, max_size: int, out: np.ndarray | None = None) -> 'Map':
         '''
         Pads the map matrix to a square matrix of size max_size x max_size on
         the bottom and right sides with zeros. This is done to make the maps
@@ -48,30 +63,74 @@ class Map:
         ----------
         max_size : int
             The target size of the padded map matrix.
+        out : np.ndarray, optional
+            Preallocated max_size x max_size buffer to pad the matrix into,
+            to avoid an allocation per call when padding many maps.
         
         Returns
         -------
         Map
             A new Map object with the padded matrix.
         '''
-        # Calculate the amount of padding needed
-        target_rows, target_cols = max_size, max_size
+        # Check the padding needed
         rows, cols = self.matrix.shape
-        pad_rows = target_rows - rows
-        pad_cols = target_cols - cols
-        assert pad_rows >= 0 and pad_cols >= 0, 'The matrix is larger than the target size.'
+        assert rows <= max_size and cols <= max_size, 'The matrix is larger than the target size.'
 
         # Pad only the bottom and right sides
-        padded_matrix = np.pad(self.matrix, 
-                            ((0, pad_rows), (0, pad_cols)), 
-                            mode='constant', 
-                            constant_values=0)
+        if out is None:
+            padded_matrix = np.zeros((max_size, max_size), dtype = self.matrix.dtype)
+        else:
+            assert out.shape == (max_size, max_size), 'The buffer does not match the target size.'
+            padded_matrix = out
+            padded_matrix[rows:, :] = 0
+            padded_matrix[:rows, cols:] = 0
+        padded_matrix[:rows, :cols] = self.matrix
+
+        return Map(padded_matrix)
+
+    @classmethod
+    def batch_pad(cls, maps: list['Map'], max_size: int, out: np.ndarray | None = None) -> np.ndarray:
+        '''
+        Pads a batch of maps to max_size x max_size on the bottom and right
+        sides with zeros, writing all of them into a single preallocated 
+        array instead of allocating one padded matrix per map.
+
+        Parameters
+        ----------
+        maps : list[Map]
+            Maps to be padded.
+        max_size : int
+            The target size of the padded map matrices.
+        out : np.ndarray, optional
+            Preallocated len(maps) x max_size x max_size buffer (e.g. a 
+            shared-memory tensor) to pad the matrices into.
 
-        return Map(padded_matrix)        
+        Returns
+        -------
+        np.ndarray
+            Array of shape (len(maps), max_size, max_size) with the padded
+            map matrices.
+        '''
+        # Single allocation for the whole batch
+        if out is None:
+            out = np.zeros((len(maps), max_size, max_size), dtype = maps[0].matrix.dtype)
+        else:
+            assert out.shape == (len(maps), max_size, max_size), 'The buffer does not match the batch and target size.'
+            out[:] = 0
+
+        # Copy each matrix in the top left corner
+        for idx, map in enumerate(maps):
+            rows, cols = map.matrix.shape
+            assert rows <= max_size and cols <= max_size, 'The matrix is larger than the target size.'
+            out[idx, :rows, :cols] = map.matrix
+        
+        return out
 
-    def plot(self, lengths: list = [], save: str = '') -> None:
+    def plot(self, lengths: list = [], save: str = '', ax: Axes | None = None) -> Axes:
         '''
-        Plots the map.
+        Plots the map. When saving, the figure is drawn on a standalone 
+        Figure (no pyplot GUI backend involved) and not shown, so that many
+        maps can be exported in a batch script.
 
         Parameters
         ----------
@@ -80,15 +139,28 @@ class Map:
             horizontal lines separating the chains. 
         save : str, optional
             If provided, the plot will be saved to this file path.
+        ax : Axes, optional
+            If provided, the map is drawn into this Axes instead of a new 
+            figure.
+
+        Returns
+        -------
+        Axes
+            Axes the map was drawn into.
         '''
+        # Figure
+        if ax is None:
+            fig = Figure() if save else plt.figure()
+            ax = fig.add_subplot()
+        fig = ax.figure
+
         # Plot
-        plt.figure()
-        plt.title("Map")
-        plt.xlabel('Residue position')    
-        plt.ylabel('Residue position')
-        vmax = 1 if self.matrix.max() < 1 else self.matrix.max()
+        ax.set_title("Map")
+        ax.set_xlabel('Residue position')    
+        ax.set_ylabel('Residue position')
+        vmax = max(1, self.max_value)
         vmin = 0 
-        plt.imshow(self.matrix, cmap="Greys", vmin=vmin, vmax=vmax, extent=(0, len(self), len(self), 0))
+        image = ax.imshow(self.matrix, cmap="Greys", vmin=vmin, vmax=vmax, extent=(0, len(self), len(self), 0))
 
         # Multiple chains
         lengths = np.array([len(self.matrix)]) if not lengths else np.array(lengths)
@@ -96,22 +168,24 @@ class Map:
 
         # Horizontal and vertical lines
         chain_separation = np.cumsum(lengths)
-        plt.vlines(x = chain_separation[:-1], ymin = 0, ymax = chain_separation[-1], colors = 'black')
-        plt.hlines(y = chain_separation[:-1], xmin = 0, xmax = chain_separation[-1], colors = 'black')
+        ax.vlines(x = chain_separation[:-1], ymin = 0, ymax = chain_separation[-1], colors = 'black')
+        ax.hlines(y = chain_separation[:-1], xmin = 0, xmax = chain_separation[-1], colors = 'black')
 
         # Ticks
         ticks = np.append(0, chain_separation)
         ticks = (ticks[1:] + ticks[:-1])/2
         alphabet_list = list(ascii_uppercase+ascii_lowercase)
-        plt.xticks(ticks, alphabet_list[:len(ticks)])
-        plt.yticks(ticks, alphabet_list[:len(ticks)])
+        ax.set_xticks(ticks, alphabet_list[:len(ticks)])
+        ax.set_yticks(ticks, alphabet_list[:len(ticks)])
 
-        # Show
-        plt.colorbar()
-        plt.show()
+        # Save or show
+        fig.colorbar(image, ax = ax)
         if save:
-            plt.savefig(save)
-        plt.clf()
+            fig.savefig(save)
+        else:
+            plt.show()
+
+        return ax
 
     def remove_diagonal(self) -> 'Map':
         '''
@@ -127,18 +201,20 @@ class Map:
             diagonals above and below the main diagonal set to zero.
         '''
         matrix = np.copy(self.matrix)
-        for idx in range(len(self)):
-            for increment in range(-2, 3):
-                if idx + increment >= 0 and idx + increment < len(self):
-                    matrix[idx, idx + increment] = 0
-                    matrix[idx + increment, idx] = 0
+        size = len(self)
+        idx = np.arange(size)
+        for offset in range(-2, 3):
+            # Zero the whole diagonal at once
+            rows = idx[max(0, -offset) : size - max(0, offset)]
+            matrix[rows, rows + offset] = 0
         return Map(matrix)
 
     def cmap(self, threshold: int) -> 'Map':
         '''
         Returns a contact map of the map matrix, where all values below a 
         distant threshold of x Angstroms are consider a contact (1) and the 
-        rest are considered non-contact (0).
+        rest are considered non-contact (0). The contact map is stored as 
+        uint8 to reduce its memory footprint.
 
         Parameters
         ----------
@@ -149,7 +225,7 @@ class Map:
         Map
             Contact Map
         '''
-        cmap_matrix = np.where(self.matrix > threshold, 1, 0)
+        cmap_matrix = (self.matrix < threshold).view(np.uint8)
         return Map(cmap_matrix)
 
 if __name__ == '__main__':
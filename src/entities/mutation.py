@@ -3,7 +3,8 @@
 Title:      Mutation
 Outline:    Mutation class to handle mutations in protein sequences. So far, it
             only supports the validation and application of simple mutations
-            in a given sequence (e.g. M13A, GS55T)
+            in a given sequence (e.g. M13A, GS55T), also in batches of 
+            sequences.
 Author:     Alejandro Sánchez Cano
 Date:       02/10/2024
 ===============================================================================
@@ -12,11 +13,43 @@ Date:       02/10/2024
 # Built-in modules
 import re
 
+# Third-party modules
+import numpy as np
+
+# Mutation format: WT amino acid(s), 1-based position, mutated amino acid(s)
+MUTATION_REGEX = re.compile(r'^([A-Z]*)(\d+)([A-Z]*)$')
+
 class Mutation:
 
     def __init__(self):
         pass
 
+    @staticmethod
+    def _parse(mutation: str) -> tuple[str, int, str]:
+        '''
+        Parses a mutation in the format 'WT_index_MUT' (e.g. M13A, GS55T).
+
+        Parameters
+        ----------
+        mutation : str
+            Mutation.
+
+        Returns
+        -------
+        tuple[str, int, str]
+            WT amino acid(s), 0-based index and mutated amino acid(s).
+
+        Raises
+        ------
+        ValueError
+            If the mutation is not in the expected format or its position
+            is not 1-based (e.g. M0A).
+        '''
+        match = MUTATION_REGEX.match(mutation)
+        if match is None or int(match.group(2)) < 1:
+            raise ValueError(f'Mutation {mutation} is not a valid mutation')
+        return match.group(1), int(match.group(2)) - 1, match.group(3)
+
     @staticmethod
     def mutate(seq: str, mutations: list[str]) -> str:
         '''
@@ -42,18 +75,74 @@ class Mutation:
         ValueError
             If a mutation is not valid for the given sequence.
         '''
+        # Mutable sequence (mutated in place)
+        mutated = bytearray(seq, 'ascii')
         for mutation in mutations:
             # Parse mutation
-            wt, index, mut = re.findall(r'^([A-Z]*)([0-9]*)([A-Z]*)', mutation)[0]
+            wt, index, mut = Mutation._parse(mutation)
             # Validate mutation
-            if seq[int(index) - 1 : int(index) - 1 + len(wt)] != wt:
-                raise ValueError(f'Mutation {mutation} is not valid for sequence {seq}') 
+            if mutated[index : index + len(wt)] != wt.encode('ascii'):
+                raise ValueError(f'Mutation {mutation} is not valid for sequence {mutated.decode()}') 
             # Mutate
-            before = seq[:int(index) - 1]
-            after = seq[int(index) + len(wt) - 1:]
-            seq = before + mut + after
+            mutated[index : index + len(wt)] = mut.encode('ascii')
+
+        return mutated.decode('ascii')
+    
+    @staticmethod
+    def mutate_batch(seqs: list[str], mutations: list[str]) -> list[str]:
+        '''
+        Applies the same list of mutations to many protein sequences. The
+        mutations are parsed once. If all of them are substitutions (same
+        WT and mutated length), the sequences are concatenated in a single
+        uint8 array and every mutation is validated and applied to all 
+        the sequences at once with numpy. Otherwise, the positions of a
+        mutation depend on the previous ones and each sequence is mutated
+        with 'mutate()'.
+
+        Parameters
+        ----------
+        seqs : list[str]
+            Initial WT protein sequences.
+        mutations : list[str]
+            List of mutations to apply to every sequence (see 'mutate()').
+
+        Returns
+        -------
+        list[str]
+            Mutated protein sequences.
 
-        return seq
+        Raises
+        ------
+        ValueError
+            If a mutation is not valid for one of the sequences.
+        '''
+        # Parse mutations once
+        parsed = [Mutation._parse(mutation) for mutation in mutations]
+
+        # Insertions and deletions -> sequentially
+        if any(len(wt) != len(mut) for wt, _, mut in parsed):
+            return [Mutation.mutate(seq, mutations) for seq in seqs]
+
+        # Concatenated sequences
+        lengths = np.fromiter(map(len, seqs), dtype = np.int64, count = len(seqs))
+        starts = np.cumsum(lengths) - lengths
+        residues = np.frombuffer(bytearray(''.join(seqs), 'ascii'), dtype = np.uint8)
+
+        # Validate and apply each mutation to all sequences
+        for mutation, (wt, index, mut) in zip(mutations, parsed):
+            wt = np.frombuffer(wt.encode('ascii'), dtype = np.uint8)
+            mut = np.frombuffer(mut.encode('ascii'), dtype = np.uint8)
+            positions = starts[:, None] + index + np.arange(len(wt))
+            valid = lengths >= index + len(wt)
+            valid[valid] = (residues[positions[valid]] == wt).all(axis = 1)
+            if not valid.all():
+                seq = seqs[np.argmin(valid)]
+                raise ValueError(f'Mutation {mutation} is not valid for sequence {seq}')
+            residues[positions] = mut
+
+        # Split mutated sequences
+        mutated = residues.tobytes().decode('ascii')
+        return [mutated[start : start + length] for start, length in zip(starts, lengths)]
     
 if __name__ == '__main__':
     '''Test class'''
@@ -61,4 +150,12 @@ if __name__ == '__main__':
     mutations = ['M1']
     print(Mutation.mutate(seq, mutations))
 
+    # Position 0 must not wrap to the previous sequence in batches
+    for mutate in (lambda: Mutation.mutate('ABM', ['M0X']), lambda: Mutation.mutate_batch(['ABM', 'CDM'], ['M0X'])):
+        try:
+            mutate()
+            raise AssertionError('Mutation M0X should not be valid')
+        except ValueError:
+            pass
+
 
@@ -16,9 +16,16 @@ from string import ascii_uppercase, ascii_lowercase
 import numpy as np
 import seaborn as sns
 import matplotlib.pyplot as plt
+from matplotlib.axes import Axes
+from matplotlib.figure import Figure
 
 
 class PLDDT:
+
+    # Confidence bucket of each integer pLDDT value (0-100)
+    labels = np.array(['Very low', 'Low', 'Confident', 'Very high'])
+    lut = np.repeat(np.arange(4, dtype = np.uint8), [50, 20, 20, 11])
+
     def __init__(self, plddt: np.ndarray):
         self.plddt = self.__format(plddt)
 
@@ -44,25 +51,43 @@ class PLDDT:
         '''
         return str(self.plddt)
     
-    def plot(self, lengths: list = []) -> None:
+    def plot(self, lengths: list = [], save: str = '', ax: Axes | None = None) -> Axes:
         '''
-        Plots pLDDT values.
+        Plots pLDDT values. When saving, the figure is drawn on a standalone 
+        Figure (no pyplot GUI backend involved) and not shown, so that many
+        plots can be exported in a batch script.
         
         Parameters
         ----------
         lengths : list
             List of chain lengths.
+        save : str, optional
+            If provided, the plot will be saved to this file path.
+        ax : Axes, optional
+            If provided, the pLDDT values are drawn into this Axes instead of
+            a new figure.
+
+        Returns
+        -------
+        Axes
+            Axes the pLDDT values were drawn into.
         '''
+        # Figure
+        if ax is None:
+            fig = Figure() if save else plt.figure()
+            ax = fig.add_subplot()
+        fig = ax.figure
+
         # Scatterplot and rugplot
         y = self.plddt
         x = list(range(len(y)))
-        hue = ['Very high' if i >= 90 else 'Condifent' if i >= 70 else 'Low' if i >= 50 else 'Very low' for i in y]
-        plddt_palette = {'Very high': '#0053D6', 'Condifent':'#65CBF3', 'Low':'#FFDB13', 'Very low':'#FF7D45'}
-        fig = sns.scatterplot(x=x, y=y, color='black')
-        sns.rugplot(x=x, hue = hue, palette = plddt_palette, legend = False, linewidth = 2, expand_margins=True)
+        buckets = PLDDT.lut[np.clip(y, 0, 100).astype(np.int32)]
+        hue = PLDDT.labels[buckets]
+        plddt_palette = {'Very high': '#0053D6', 'Confident':'#65CBF3', 'Low':'#FFDB13', 'Very low':'#FF7D45'}
+        sns.scatterplot(x=x, y=y, color='black', ax=ax)
+        sns.rugplot(x=x, hue = hue, palette = plddt_palette, legend = False, linewidth = 2, expand_margins=True, ax=ax)
 
         # Horizontal spans
-        ax = plt.gca()
         ax.axhspan(90, 100, alpha = 0.5, color = '#0053D6')
         ax.axhspan(70, 90, alpha = 0.5, color = '#65CBF3')
         ax.axhspan(50, 70, alpha = 0.5, color = '#FFDB13')
@@ -75,24 +100,28 @@ class PLDDT:
 
             # Vertical sepratory lines      
             chain_separation = np.cumsum(lengths)
-            plt.vlines(x = chain_separation[:-1], ymin = 0, ymax = chain_separation[-1], colors = 'black')
+            ax.vlines(x = chain_separation[:-1], ymin = 0, ymax = chain_separation[-1], colors = 'black')
 
             # Chain ticks
             ticks = np.append(0, chain_separation)
             ticks = (ticks[1:] + ticks[:-1])/2
             alphabet_list = list(ascii_uppercase+ascii_lowercase)
-            plt.xticks(ticks, alphabet_list[:len(ticks)])
+            ax.set_xticks(ticks, alphabet_list[:len(ticks)])
 
         # Axis labels
-        fig.set_xlabel('Residue index')
-        fig.set_ylabel('pLDDT')
+        ax.set_xlabel('Residue index')
+        ax.set_ylabel('pLDDT')
+
+        # Save or show
+        if save:
+            fig.savefig(save, bbox_inches='tight')
+        else:
+            plt.show()
 
-        # Save plot
-        plt.savefig(f'plddt_pi_svp.png', bbox_inches='tight')
-        plt.show()
+        return ax
     
 if __name__ == '__main__':
     '''Test class'''
     import numpy as np
     plddt = PLDDT(np.arange(100, 90, -1))
-    print(plddt.plot())
\ No newline at end of file
+    print(plddt.plot(save = 'plddt_pi_svp.png'))
\ No newline at end of file
@@ -4,7 +4,11 @@ Title:      PPI
 Outline:    PPI class to store and manage the dimer protein-protein
             interactions (PPI) in the database. It provides methods to create
             new instances, check if a PPI is in the database, iterate over all
-            PPIs, and pickle the instance.
+            PPIs, and pickle the instance. The arguments loaded for every PPI
+            (interaction, origin and partition) are also indexed in a single
+            pickled file (PPI_INDEX) to load them at once. All the arguments
+            of a PPI are stored in a single container file (.ppi), while the
+            legacy one-file-per-argument layout is still read as a fallback.
 Author:     Alejandro Sánchez Cano
 Date:       10/07/2025
 ===============================================================================
@@ -14,13 +18,14 @@ Date:       10/07/2025
 # ALSO, PYTHON IMPLEMENTS CACHING ITSELF, SO OPENING THE PROTEINS GOES FROM 12 TO 3 SECS
 
 # Buit-in modules
+import os
 import pprint
-from functools import cache
-from collections import Counter
+from collections import Counter, deque
 from typing import Any, Generator
-from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
 
 # Third-party modules
+import numpy as np
 import pandas as pd
 from tqdm import tqdm
 
@@ -34,14 +39,23 @@ from src.entities.protein import Protein
 
 class PPI:
 
-    def __init__(self, p1: Protein, p2: Protein, *args):
+    # Arguments always added by 'iterate()', also stored in PPI_INDEX
+    default_args = ('interaction', 'origin', 'partition')
+
+    def __init__(self, p1: Protein | str, p2: Protein | str, *args, listing: set[str] | None = None):
         # Instantiate from folder
         self.p1 = p1
         self.p2 = p2
+        container = PPI._container(self.__hash__(), listing) if args else {}
         for arg in args:
-            self._add_argument(arg)
+            self._add_argument(arg, container, listing)
     
-    def _add_argument(self, arg: str) -> None:
+    def _add_argument(
+            self, 
+            arg: str, 
+            container: dict[str, Any] | None = None, 
+            listing: set[str] | None = None
+            ) -> None:
         '''
         Multipurpose method that thakes an argument name, unpickles the file
         associated with the PPI and said name, and adds it to the instance in 
@@ -54,13 +68,15 @@ class PPI:
         ----------
         arg : str
             Name of the argument to be added to the instance.
+        container : dict[str, Any], optional
+            Already unpickled container of the PPI, to avoid reading it once
+            per argument.
+        listing : set[str], optional
+            File names in the PPI folder (see '_listing()').
         '''
-        file_stem = f'{self.p1.__hash__()}={self.p2.__hash__()}'
-        file_path = path.PPI / f'{file_stem}.{arg}'
-        try:
-            obj = utils.unpickle(file_path)
-        except FileNotFoundError:
-            obj = None
+        file_stem = self.__hash__()
+        container = PPI._container(file_stem, listing) if container is None else container
+        obj = PPI._load(file_stem, arg, container, listing)
         arg, *subargs = arg.split('.')
         existent = getattr(self, arg, None)
         nested = current = {}
@@ -102,10 +118,10 @@ class PPI:
 
     @property
     def p1(self) -> Protein:
+        # Lazily promote the hash to a Protein object on first access
         if isinstance(self.__dict__['p1'], str):
-            return Protein(self.__dict__['p1'])
-        elif isinstance(self.__dict__['p1'], Protein):
-            return self.__dict__['p1']
+            self.__dict__['p1'] = Protein(self.__dict__['p1'])
+        return self.__dict__['p1']
 
     @p1.setter
     def p1(self, p1: Protein) -> None:
@@ -113,10 +129,10 @@ class PPI:
 
     @property
     def p2(self) -> Protein:
+        # Lazily promote the hash to a Protein object on first access
         if isinstance(self.__dict__['p2'], str):
-            return Protein(self.__dict__['p2'])
-        elif isinstance(self.__dict__['p2'], Protein):
-            return self.__dict__['p2']
+            self.__dict__['p2'] = Protein(self.__dict__['p2'])
+        return self.__dict__['p2']
 
     @p2.setter
     def p2(self, p2: Protein) -> None:
@@ -142,53 +158,220 @@ class PPI:
         str
             Hashed protein sequence.
         '''
-        return f'{self.p1.__hash__()}={self.p2.__hash__()}'
+        p1, p2 = self.__dict__['p1'], self.__dict__['p2']
+        p1 = p1 if isinstance(p1, str) else p1.__hash__()
+        p2 = p2 if isinstance(p2, str) else p2.__hash__()
+        return f'{p1}={p2}'
 
     @staticmethod
-    def iterate(*args) -> Generator['PPI', None, None]:
+    def iterate(*args, prefetch: int = 100) -> Generator['PPI', None, None]:
         '''
         Iterates over all PPI objects in the database, unpickling them and
-        returning a list of PPI instances. A couple of tricks are used to
-        speed up the process:
-        1. Caching Protein object instantiation
-        2. Unpickling PPI objects with multithreading
+        yielding PPI instances. A couple of tricks are used to speed up the
+        process:
+        1. Lazily instantiating Protein objects (only when p1/p2 are used)
+        2. Reading PPI files with a small thread pool (sized to the cores)
+        3. Loading the default arguments of all PPIs at once (PPI_INDEX)
+        4. Streaming PPIs while the next ones are being unpickled, so that
+        disk IO overlaps with the work done on the yielded PPIs
 
         Parameters
         ----------
         *args : str
             Names of the arguments to be added to the PPI instances.
             Some are always present by default.
+        prefetch : int, optional
+            Number of PPIs unpickled ahead of the one being yielded.
+
+        Yields
+        ------
+        PPI
+            PPI instances.
+        '''
+        # Utils functions
+        args = [arg for arg in args if arg not in PPI.default_args]
+        index = PPI._index()
+        def instantiate(file_stem: str) -> 'PPI':
+            p1, p2 = file_stem.split('=')
+            if file_stem in index:
+                ppi = PPI(p1, p2, *args, listing = listing)
+                ppi.__dict__.update(index[file_stem])
+            else:
+                ppi = PPI(p1, p2, *args, *PPI.default_args, listing = listing)
+            return ppi
+
+        # Fetch PPI files (Protein objects are loaded on demand)
+        listing = PPI._listing()
+        file_stems = sorted(PPI._file_stems(listing))
+        logger.info(f'Unpickling {len(file_stems)} PPI objects...')
+
+        # Few PPIs do not amortize the thread pool
+        if len(file_stems) < 256:
+            for file_stem in tqdm(file_stems):
+                yield instantiate(file_stem)
+            return
+
+        # Threads overlap the file reads, so few of them are enough
+        with ThreadPoolExecutor(max_workers = min(8, os.cpu_count() or 4)) as executor:
+
+            # Keep a bounded window of PPIs being unpickled ahead
+            pending = deque(executor.submit(instantiate, file_stem) for file_stem in file_stems[:prefetch])
+            for idx in tqdm(range(len(file_stems))):
+                ppi = pending.popleft().result()
+                if idx + prefetch < len(file_stems):
+                    pending.append(executor.submit(instantiate, file_stems[idx + prefetch]))
+                yield ppi
+
+    @staticmethod
+    def _container(file_stem: str, listing: set[str] | None = None) -> dict[str, Any]:
+        '''
+        Unpickles the container file of a PPI, which maps every argument
+        name (arg.subarg1.subarg2 for nested ones) to its object, so that
+        all the arguments of a PPI are read with a single file access.
+
+        Parameters
+        ----------
+        file_stem : str
+            PPI file stem.
+        listing : set[str], optional
+            File names in the PPI folder, to skip the file access if there
+            is no container.
 
         Returns
         -------
-        list[PPI]
-            List of PPI instances.
+        dict[str, Any]
+            Argument name to object mapping (empty if there is no container).
         '''
-        # Utils functions
-        args = (*args, 'interaction', 'origin', 'partition')
-        def instantiate(proteins: str) -> 'PPI':
-            p1, p2 = proteins
-            return PPI(p1, p2, *args)
-        @cache
-        def hash2protein(hash_: str) -> Protein:
-            return Protein(hash_)
-
-        # Fetch Protein files
-        files = sorted(list(path.PPI.glob('*.p1')))
-        protein_filenames = [file_name.stem.split('=') for file_name in files]
-        logger.info(f'Unpickling Protein objects...')
-        proteins = [(hash2protein(p1), hash2protein(p2)) for p1, p2 in tqdm(protein_filenames)]
-        
-        # Fetch PPI files
-        ppis = []
-        logger.info(f'Unpickling {len(proteins)} PPI objects...')
-        with ThreadPoolExecutor(max_workers=50) as executor:
-            for result in tqdm(executor.map(instantiate, proteins), total=len(proteins)):
-                ppis.append(result)
+        if listing is not None and f'{file_stem}.ppi' not in listing:
+            return {}
+        try:
+            return utils.unpickle(path.PPI / f'{file_stem}.ppi')
+        except FileNotFoundError:
+            return {}
 
-        # Return as generator
-        for ppi in tqdm(ppis):
-            yield ppi
+    @staticmethod
+    def _load(
+            file_stem: str, 
+            arg: str, 
+            container: dict[str, Any], 
+            listing: set[str] | None = None
+            ) -> Any:
+        '''
+        Retrieves an argument of a PPI from its container, falling back to
+        the legacy file of the argument for PPIs not migrated yet.
+
+        Parameters
+        ----------
+        file_stem : str
+            PPI file stem.
+        arg : str
+            Name of the argument.
+        container : dict[str, Any]
+            Unpickled container of the PPI.
+        listing : set[str], optional
+            File names in the PPI folder, to skip the file access if there
+            is no legacy file.
+
+        Returns
+        -------
+        Any
+            Argument object (None if not found).
+        '''
+        if arg in container:
+            return container[arg]
+        if listing is not None and f'{file_stem}.{arg}' not in listing:
+            return None
+        try:
+            return utils.unpickle(path.PPI / f'{file_stem}.{arg}')
+        except FileNotFoundError:
+            return None
+
+    @staticmethod
+    def _default_arguments(file_stem: str) -> dict[str, Any]:
+        '''
+        Retrieves the arguments in 'PPI.default_args' of a PPI. It runs in
+        the worker processes that build the PPI_INDEX, since unpickling the
+        whole container is CPU-bound while the result is small.
+
+        Parameters
+        ----------
+        file_stem : str
+            PPI file stem.
+
+        Returns
+        -------
+        dict[str, Any]
+            Default argument name to object mapping.
+        '''
+        container = PPI._container(file_stem)
+        return {arg: PPI._load(file_stem, arg, container) for arg in PPI.default_args}
+
+    @staticmethod
+    def _listing() -> set[str]:
+        '''
+        Lists the file names in the PPI folder with a single directory scan
+        that does not build Path objects. Checking file names against it
+        avoids opening (and raising FileNotFoundError for) missing files.
+
+        Returns
+        -------
+        set[str]
+            File names in the PPI folder.
+        '''
+        return {entry.name for entry in os.scandir(path.PPI)}
+
+    @staticmethod
+    def _file_stems(listing: set[str] | None = None) -> list[str]:
+        '''
+        Lists the file stems of the PPIs in the PPI folder (one per .ppi
+        container or legacy .p1 file).
+
+        Parameters
+        ----------
+        listing : set[str], optional
+            File names in the PPI folder (scanned if not provided).
+
+        Returns
+        -------
+        list[str]
+            PPI file stems.
+        '''
+        listing = PPI._listing() if listing is None else listing
+        return list({
+            name[:-3] if name.endswith('.p1') else name[:-4]
+            for name in listing
+            if name.endswith(('.p1', '.ppi'))
+            })
+
+    @staticmethod
+    def _index() -> dict[str, dict[str, Any]]:
+        '''
+        Retrieves the arguments in 'PPI.default_args' of all the PPIs in
+        the PPI folder with a single unpickling of the PPI_INDEX file 
+        instead of one unpickling per PPI and argument. The index is 
+        built from the PPI folder if it does not exist, and it is removed
+        every time a PPI object is pickled to avoid stale data.
+
+        Returns
+        -------
+        dict[str, dict[str, Any]]
+            PPI file stem to default arguments mapping.
+        '''
+        # Load index
+        try:
+            return utils.unpickle(path.PPI_INDEX)
+
+        # Build index from the PPI folder
+        except FileNotFoundError:
+            logger.info(f'Indexing PPI objects...')
+            file_stems = PPI._file_stems()
+            workers = os.cpu_count() or 1
+            with ProcessPoolExecutor(max_workers = workers) as executor:
+                chunksize = max(1, len(file_stems) // (8 * workers))
+                default_args = executor.map(PPI._default_arguments, file_stems, chunksize = chunksize)
+                index = dict(zip(file_stems, tqdm(default_args, total = len(file_stems))))
+            utils.pickle(data = index, path = path.PPI_INDEX)
+            return index
 
     def interact(self) -> int | str:
         '''
@@ -260,13 +443,11 @@ class PPI:
         # Multiple origins -> condense Isa's interactions
         origin2interactions = {origin:interaction for origin, interaction in zip(self.origin, self.interaction)}
         scoring_origin = [origin for origin in self.origin if '&' in origin]
-        origin2interactions['scoring'] = []
+        scoring = []
         for k in scoring_origin:
-            if k in scoring_origin:
-                origin2interactions['scoring'].extend(origin2interactions[k])
-                del origin2interactions[k]
-        if origin2interactions['scoring'] == []:
-            del origin2interactions['scoring']
+            scoring.extend(origin2interactions.pop(k))
+        if scoring:
+            origin2interactions['scoring'] = scoring
         # All interactions from Scoring independent dataset
         if len(origin2interactions) == 1 and 'scoring' in origin2interactions:
             scored = score_single_origin_interactions(origin2interactions['scoring'])
@@ -276,32 +457,149 @@ class PPI:
             scored = [score_single_origin_interactions(interactions) for interactions in origin2interactions.values()]
             if len(set(scored)) == 1:
                 return scored[0]
-            scored = [s for s in scored if s != '?']
-            freqs = list(Counter(scored).values())
-            is_balanced = lambda x: max(x) == min(x) 
-            if len(set(scored)) == 1 or not is_balanced(freqs):
-                return max(set(scored), key = scored.count)
+            counts = Counter(s for s in scored if s != '?').most_common()
+            if len(counts) == 1 or counts[0][1] != counts[1][1]:
+                return counts[0][0]
             else:
                 return '?'
 
+    @staticmethod
+    def interaction_frame(ppis: list['PPI']) -> pd.DataFrame:
+        '''
+        Flattens the origins and interactions of PPIs into a long 
+        DataFrame with one row per interaction value, the input of 
+        'interact_all()'. Origins without interaction values are kept as a
+        row with a None value.
+
+        Parameters
+        ----------
+        ppis : list[PPI]
+            PPI instances.
+
+        Returns
+        -------
+        pd.DataFrame
+            DataFrame with 'hash', 'origin', and 'interaction' columns.
+        '''
+        rows = [
+            (ppi.__hash__(), origin, value)
+            for ppi in ppis
+            for origin, values in zip(ppi.origin, ppi.interaction)
+            for value in (values if len(values) else [None])
+            ]
+        return pd.DataFrame(rows, columns = ['hash', 'origin', 'interaction'])
+
+    @staticmethod
+    def interact_all(df: pd.DataFrame) -> pd.Series:
+        '''
+        Vectorized version of 'interact()' for many PPIs at once. The 
+        interaction cases are resolved with boolean masks and group-wise
+        aggregations instead of one Python call per PPI:
+        - Each origin is scored like a single origin, except that all the
+        Scoring independent dataset origins (with '&') are condensed into
+        a single one.
+        - The PPI score is the majority vote of its origin scores, 
+        disregarding '?', and '?' if there is no majority.
+
+        Parameters
+        ----------
+        df : pd.DataFrame
+            DataFrame with one row per interaction value and 'hash', 
+            'origin', and 'interaction' columns (see 
+            'interaction_frame()').
+
+        Returns
+        -------
+        pd.Series
+            Interaction score of each PPI hash -> 1, 0, or '?'.
+        '''
+        # Condense Isa's interactions
+        df = df.assign(origin = df['origin'].where(~df['origin'].str.contains('&'), 'scoring'))
+        origins = df[['hash', 'origin']].drop_duplicates()
+
+        # Fully disregard nan, 'AUTO', 'ND', 'NLW', and consider 'NC' as 0.5
+        values = df[~df['interaction'].isin(['AUTO', 'ND', 'NLW']) & df['interaction'].notna()]
+        values = values.assign(interaction = values['interaction'].replace('NC', 0.5).astype(float))
+
+        # Score each origin
+        values = values.assign(has_1 = values['interaction'] == 1, has_0 = values['interaction'] == 0)
+        stats = values.groupby(['hash', 'origin']).agg(
+            n = ('interaction', 'size'),
+            average = ('interaction', 'mean'),
+            has_1 = ('has_1', 'any'),
+            has_0 = ('has_0', 'any')
+            )
+        stats = origins.merge(stats.reset_index(), on = ['hash', 'origin'], how = 'left')
+        stats = stats.fillna({'n': 0, 'has_1': False, 'has_0': False}).astype({'has_1': bool, 'has_0': bool})
+        two_values = stats['n'] == 2
+        unexpected = two_values & ~stats['has_1'] & ~stats['has_0'] & (stats['average'] != 0.5)
+        if unexpected.any():
+            raise ValueError(f'Unexpected values in {stats.loc[unexpected, "hash"].to_list()}')
+        stats['score'] = np.select(
+            condlist = [
+                (stats['n'] == 1) & (stats['average'] != 0.5),
+                two_values & stats['has_1'],
+                two_values & stats['has_0'],
+                (stats['n'] > 2) & (stats['average'] > 3/5),
+                (stats['n'] > 2) & (stats['average'] < 2/5)
+                ],
+            choicelist = [stats['average'], 1, 0, 1, 0],
+            default = -1
+            )
+
+        # Majority vote of the origins (disregarding '?')
+        votes = stats.assign(ones = stats['score'] == 1, zeros = stats['score'] == 0)
+        votes = votes.groupby('hash')[['ones', 'zeros']].sum()
+        interaction = np.select(
+            condlist = [votes['ones'] > votes['zeros'], votes['zeros'] > votes['ones']],
+            choicelist = [1, 0],
+            default = -1
+            )
+        
+        return pd.Series(interaction, index = votes.index, dtype = object).replace(-1, '?')
+
+    @staticmethod
+    def interact_batch(ppis: list['PPI']) -> list[int | str]:
+        '''
+        Calculates the interaction score of many PPIs at once with the
+        vectorized 'interact_all()', in the same order as the PPIs.
+
+        Parameters
+        ----------
+        ppis : list[PPI]
+            PPI instances.
+
+        Returns
+        -------
+        list[int | str]
+            Interaction score of each PPI -> 1, 0, or '?'.
+        '''
+        scores = PPI.interact_all(PPI.interaction_frame(ppis))
+        hashes = [ppi.__hash__() for ppi in ppis]
+        return scores.reindex(hashes, fill_value = '?').to_list()
+
     def pickle(self) -> None:
         '''
-        Pickles the content of the PPI instance to several files in the PPI 
-        folder with the md5 hash of the sequences (separated by =) as the file
-        stem. The extensions of the files are the same as the arguments
-        passed to the PPI instance. 
+        Pickles the content of the PPI instance to a single container file
+        in the PPI folder with the md5 hash of the sequences (separated by =)
+        as the file stem and .ppi as extension. Nested dictionaries are 
+        flattened to arg.subarg1.subarg2 keys, and the arguments are merged
+        with the ones already in the container, since the instance may only
+        hold some of them.
         '''
-        def save_data(key: str, data: Any, filepath: str):
+        def flatten(key: str, data: Any) -> None:
             preserved_dicts = ['interface_features']
             if isinstance(data, dict) and k not in preserved_dicts:
-                for key, value in data.items():
-                    save_data('', value, f'{filepath}.{key}')
+                for subkey, value in data.items():
+                    flatten(f'{key}.{subkey}', value)
             else:
                 if data is not None:
-                    utils.pickle(data=data, path=filepath)
+                    container[key] = data
         file_stem = self.__hash__()
-        self.p1 = self.p1.__hash__()
-        self.p2 = self.p2.__hash__()
+        path.PPI_INDEX.unlink(missing_ok = True)
+        self.p1, self.p2 = file_stem.split('=')
+        container = PPI._container(file_stem)
         for k, v in self.__dict__.items():
-            save_data(k, v, f'./{file_stem}.{k}')
+            flatten(k, v)
+        utils.pickle(data = container, path = path.PPI / f'{file_stem}.ppi')
 
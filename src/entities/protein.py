@@ -11,11 +11,15 @@ Date:       02/10/2024
 """
 
 # Built-in modules
+import os
 import pprint
+import copy
 import hashlib
-from typing import Generator
+from functools import cache, lru_cache
+from typing import Any, Generator
 
 # Third-party modules
+import numpy as np
 from tqdm import tqdm
 
 # Custom modules
@@ -24,6 +28,16 @@ from src.misc import utils
 
 class Protein:
 
+    # Proteins whose M-I-K-C domains cannot be split: 2K, 0M, 0M, noMIKC, 
+    # dels deleted kink k1-k2, 0K2K3
+    non_mikc_bioids = frozenset({
+        'SlRIN', 'SlTM3', 'ZaMADS70', 'SlMBP13', 'TtAG1-del3-del13', 'Ta42G17', 'Ta57H08'
+        })
+
+    # Unpickled Protein objects kept in memory by '_load()' (LRU cache)
+    cache_size = 64
+    _loader = None
+
     def __init__(self, seq: str, new = False):
         '''
         Constructor method for the Protein class.
@@ -52,14 +66,11 @@ class Protein:
         '''
         # File stem
         seq = seq.split('.')[0]
-        if not any(char.isdigit() for char in seq):
-            file_stem = hashlib.md5(seq.encode()).hexdigest()
-        else:
-            file_stem = seq
+        file_stem = Protein._seq_to_stem(seq)
 
         # Instantiate from folder (from __dict__)
         try:
-            __dict__ = utils.unpickle(path.PROTEIN / f'{file_stem}.prot')
+            __dict__ = Protein._load(file_stem)
             for attribute, value in __dict__.items():
                 setattr(self, attribute, value)
         
@@ -88,7 +99,127 @@ class Protein:
         str
             Hashed protein sequence.
         '''
-        return hashlib.md5(self.seq.encode()).hexdigest()
+        return Protein._md5(self.seq)
+
+    @staticmethod
+    @cache
+    def _md5(seq: str) -> str:
+        '''
+        Computes the md5 hash of a protein sequence once per sequence. It is
+        memoized by sequence rather than stored in the instance, so that it
+        is never pickled with the Protein nor stale if the sequence changes.
+
+        Parameters
+        ----------
+        seq : str
+            Protein sequence.
+
+        Returns
+        -------
+        str
+            Hashed protein sequence.
+        '''
+        return hashlib.md5(seq.encode()).hexdigest()
+
+    @staticmethod
+    def _load(file_stem: str) -> dict[str, Any]:
+        '''
+        Retrieves the __dict__ of a Protein object. The last 'cache_size'
+        unpickled Protein objects are cached (until a Protein object is 
+        pickled), so repeated PPI.iterate or Protein instantiations do not
+        read their files again. The cache is built when first used, so
+        'cache_size' can be changed at runtime. Each call gets its own copy
+        of the containers (see '_copy()').
+
+        Parameters
+        ----------
+        file_stem : str
+            Protein file stem.
+
+        Returns
+        -------
+        dict[str, Any]
+            Instance attributes.
+
+        Raises
+        ------
+        FileNotFoundError
+            If the Protein object has not been pickled.
+        '''
+        loader = Protein._loader
+        if loader is None or loader.cache_parameters()['maxsize'] != Protein.cache_size:
+            loader = Protein._loader = lru_cache(maxsize = Protein.cache_size)(Protein._unpickle)
+        return Protein._copy(loader(file_stem))
+
+    @staticmethod
+    def _unpickle(file_stem: str) -> dict[str, Any]:
+        '''
+        Unpickles the __dict__ of a Protein object.
+
+        Parameters
+        ----------
+        file_stem : str
+            Protein file stem.
+
+        Returns
+        -------
+        dict[str, Any]
+            Instance attributes.
+        '''
+        return utils.unpickle(path.PROTEIN / f'{file_stem}.prot')
+
+    @staticmethod
+    def _copy(value: Any) -> Any:
+        '''
+        Copies a cached attribute value so that instances do not share 
+        their containers. Dicts, lists, sets and tuples are copied 
+        recursively, while numpy arrays (e.g. embeddings) are shared 
+        read-only instead of copied, so modifying them in place raises 
+        instead of silently changing the other instances. Strings and 
+        numbers are immutable and other objects are deep copied.
+
+        Parameters
+        ----------
+        value : Any
+            Cached attribute value.
+
+        Returns
+        -------
+        Any
+            Copied attribute value.
+        '''
+        if isinstance(value, (str, int, float, bool, type(None))):
+            return value
+        if isinstance(value, np.ndarray):
+            value.flags.writeable = False
+            return value
+        if isinstance(value, dict):
+            return {key: Protein._copy(item) for key, item in value.items()}
+        if isinstance(value, (list, set, tuple)):
+            return type(value)(Protein._copy(item) for item in value)
+        return copy.deepcopy(value)
+
+    @staticmethod
+    @cache
+    def _seq_to_stem(seq: str) -> str:
+        '''
+        Resolves the file stem of a Protein, which is the md5 hash of the
+        sequence or, if a hash (it contains digits) is given, the hash 
+        itself. It is memoized like '_md5()'.
+
+        Parameters
+        ----------
+        seq : str
+            Protein sequence or hash.
+
+        Returns
+        -------
+        str
+            Protein file stem.
+        '''
+        if not any(char.isdigit() for char in seq):
+            return Protein._md5(seq)
+        return seq
 
     @classmethod
     def new(cls, **kwargs: dict) -> None:
@@ -120,10 +251,7 @@ class Protein:
         bool
             True if sequence is in the database, False otherwise.
         '''
-        if not any(char.isdigit() for char in seq):
-            file_stem = hashlib.md5(seq.encode()).hexdigest()
-        else:
-            file_stem = seq
+        file_stem = Protein._seq_to_stem(seq)
         return (path.PROTEIN / f'{file_stem}.prot').exists()
 
     @staticmethod
@@ -136,10 +264,9 @@ class Protein:
         Protein
             Protein object.
         '''
-        files = sorted(list(path.PROTEIN.glob('*')))
-        total = len(files)
-        for protein in tqdm(files, total=total):
-            yield Protein(protein.stem)
+        files = sorted(entry.name for entry in os.scandir(path.PROTEIN))
+        for protein in tqdm(files):
+            yield Protein(os.path.splitext(protein)[0])
     
     def pickle(self) -> None:
         '''
@@ -152,6 +279,7 @@ class Protein:
         file_stem = self.__hash__()
         filepath = path.PROTEIN / f'{file_stem}.prot'
         utils.pickle(data = self.__dict__, path = filepath)
+        Protein._loader = None
 
     def mikc(self) -> tuple[str, str, str, str]:
         '''
@@ -162,24 +290,25 @@ class Protein:
         tuple[str, str, str, str]
             M-I-K-C sequences of the protein.
         '''
-        if self.bioID in ['SlRIN', 'SlTM3', 'ZaMADS70', 'SlMBP13', 'TtAG1-del3-del13', 'Ta42G17' , 'Ta57H08']:
-            # 2K, 0M, 0M, noMIKC, dels deleted kink k1-k2, 0K2K3
+        if self.bioID in Protein.non_mikc_bioids:
             print(self.__hash__())
             return 0, 0, 0, 0
-        try:
-            assert 'IPR002100' in self.domains, 'Domain IPR002100 not found'
-            assert 'IPR002487' in self.domains, 'Domain IPR002487 not found'
-            assert len(self.domains['IPR002100']) == 1, 'Multiple domains IPR002100 found'
-            assert len(self.domains['IPR002487']) == 1, 'Multiple domains IPR002487 found'
-        except AssertionError as e:
-            print(self.bioID)
-            print(self.domains)
-            print(e)
+        if __debug__:
+            try:
+                assert 'IPR002100' in self.domains, 'Domain IPR002100 not found'
+                assert 'IPR002487' in self.domains, 'Domain IPR002487 not found'
+                assert len(self.domains['IPR002100']) == 1, 'Multiple domains IPR002100 found'
+                assert len(self.domains['IPR002487']) == 1, 'Multiple domains IPR002487 found'
+            except AssertionError as e:
+                print(self.bioID)
+                print(self.domains)
+                print(e)
         
         try:
-            m_i_limit = int(self.domains['IPR002100'][0][-1] + 1)
-            i_k_limit = int(self.domains['IPR002487'][0][0] + 1)
-            k_c_limit = int(self.domains['IPR002487'][0][-1] + 1)
+            # Domains are (start, end) tuples of ints
+            m_i_limit = self.domains['IPR002100'][0][1] + 1
+            i_k_limit = self.domains['IPR002487'][0][0] + 1
+            k_c_limit = self.domains['IPR002487'][0][1] + 1
             m, i, k, c = self.seq[:m_i_limit], self.seq[m_i_limit:i_k_limit], self.seq[i_k_limit:k_c_limit], self.seq[k_c_limit:]
             assert len(self.seq) == len(m) + len(i) + len(k) + len(c), 'Domain lengths do not add up to protein sequence'
 
@@ -0,0 +1,60 @@
+"""
+===============================================================================
+Title:      HTTP module
+Outline:    Shared asynchronous HTTP session for the PlaPPISite, UniProt,
+            AlphaFold, and InterPro requests. A single aiohttp session (and
+            TCP connector) is used per event loop, so DNS lookups and 
+            keep-alive connections are reused across all the asynchronous
+            fetch routines running in the loop. The session is closed when
+            the last routine using it finishes.
+Docs:       https://docs.aiohttp.org/en/stable/client_advanced.html#connectors
+Author:     Alejandro Sánchez Cano
+Date:       02/10/2024
+===============================================================================
+"""
+
+# Built-in modules
+import asyncio
+import contextlib
+from typing import AsyncIterator
+
+# Third-party modules
+import aiohttp
+
+# Event loop -> [session, number of routines using it]
+_sessions = {}
+
+@contextlib.asynccontextmanager
+async def get_session() -> AsyncIterator[aiohttp.ClientSession]:
+    '''
+    Provides the aiohttp session shared by all the asynchronous fetch 
+    routines of the running event loop, creating it if needed.
+
+    Yields
+    ------
+    aiohttp.ClientSession
+        Shared asynchronous HTTP session.
+    '''
+    # Create session
+    loop = asyncio.get_running_loop()
+    if loop not in _sessions:
+        connector = aiohttp.TCPConnector(
+            limit = 200,
+            limit_per_host = 32,
+            ttl_dns_cache = 300,
+            keepalive_timeout = 60
+            )
+        _sessions[loop] = [aiohttp.ClientSession(connector = connector), 0]
+
+    # Share session
+    entry = _sessions[loop]
+    entry[1] += 1
+    try:
+        yield entry[0]
+    
+    # Close session when it is no longer used
+    finally:
+        entry[1] -= 1
+        if entry[1] == 0:
+            del _sessions[loop]
+            await entry[0].close()
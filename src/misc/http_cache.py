@@ -0,0 +1,86 @@
+"""
+===============================================================================
+Title:      HTTP cache module
+Outline:    Disk-backed cache of remote API responses (InterPro, UniProt,
+            AlphaFold, PlaPPISite), which are effectively immutable over
+            weeks. Each response is pickled in its own file, named after the
+            SHA-256 hash of the request URL, and expires after a time-to-live
+            given by the modification time of the file. Files are written
+            to a temporary name and then renamed, so concurrent readers never
+            see a partially written response.
+Docs:       https://docs.python.org/3/library/hashlib.html
+Author:     Alejandro Sánchez Cano
+Date:       02/10/2024
+===============================================================================
+"""
+
+# Built-in modules
+import time
+import uuid
+import hashlib
+from typing import Any
+from pathlib import Path
+
+# Custom modules
+from src.misc import path
+from src.misc import utils
+
+# Default time-to-live of the cached responses (1 week)
+TTL = 7 * 24 * 60 * 60
+
+def _filepath(url: str) -> Path:
+    '''
+    Path of the cache file of a URL.
+
+    Parameters
+    ----------
+    url : str
+        Request URL (or any other string uniquely identifying the request).
+
+    Returns
+    -------
+    Path
+        Cache file path.
+    '''
+    return path.CACHE / f'{hashlib.sha256(url.encode()).hexdigest()}.pkl'
+
+def read(url: str, ttl: int = TTL) -> Any:
+    '''
+    Retrieves the cached response of a URL.
+
+    Parameters
+    ----------
+    url : str
+        Request URL (or any other string uniquely identifying the request).
+    ttl : int, optional
+        Time-to-live in seconds, by default 1 week.
+
+    Returns
+    -------
+    Any
+        Cached response, or None if it is not cached or it has expired.
+    '''
+    filepath = _filepath(url)
+    try:
+        if time.time() - filepath.stat().st_mtime > ttl:
+            return None
+        return utils.unpickle(filepath)
+    except FileNotFoundError:
+        return None
+
+def write(url: str, response: Any) -> None:
+    '''
+    Caches the response of a URL.
+
+    Parameters
+    ----------
+    url : str
+        Request URL (or any other string uniquely identifying the request).
+    response : Any
+        Pickable response.
+    '''
+    path.CACHE.mkdir(parents = True, exist_ok = True)
+    filepath = _filepath(url)
+    tmp_filepath = filepath.with_suffix(f'.{uuid.uuid4().hex}.tmp')
+    utils.pickle(data = response, path = tmp_filepath)
+    tmp_filepath.replace(filepath)
@@ -12,8 +12,8 @@ Date:       02/10/2024
 """
 
 # Built-in modules
+import sys
 import logging
-import inspect
 from pathlib import Path
 
 # Standard output handler
@@ -23,7 +23,7 @@ formatter = logging.Formatter('%(filename)s %(levelname)s %(message)s')
 stdout_handler.setFormatter(formatter)
 
 # File handler
-main_file = inspect.stack()[-1].filename
+main_file = getattr(sys.modules.get('__main__'), '__file__', None) or sys.argv[0] or 'repl'
 main_file = Path(main_file)
 logs_file = [part if part != 'src' else 'logs' for part in main_file.parts]
 logs_file = Path(*logs_file)
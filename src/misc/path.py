@@ -25,13 +25,18 @@ ESMFOLD = TOOLS / 'ESMFold'
 # Data directories
 DATA = CHONKY / 'ML4MIKC'
 INTERACTORS = DATA / 'Interactors'
+INTERACTORS_INDEX = DATA / 'Interactors.index'
+INTERACTORS_ARCHIVE = DATA / 'Interactors.flat'
 NETWORKS = DATA / 'Networks'
 LITERATUREMINING = DATA / 'LiteratureMining'
 SCORING = DATA / 'Scoring'
 PROTEIN = DATA / 'Protein'
 PPI = DATA / 'PPI'
+PPI_INDEX = DATA / 'PPI.index'
+CACHE = DATA / 'Cache'
 
 # Databases
 DATABASES = DATA / 'Databases'
 BIOGRID = DATABASES / 'BioGRID'
-INTACT = DATABASES / 'IntAct'
\ No newline at end of file
+INTACT = DATABASES / 'IntAct'
+VIRIDIPLANTAE = DATABASES / 'viridiplantae_taxon_ids.pkl'
\ No newline at end of file
@@ -2,20 +2,50 @@
 ===============================================================================
 Title:      Utils module
 Outline:    Utility functions for general purposes:
-                - Pickle and unpickle objects.
+                - Pickle and unpickle objects (with out-of-band buffers).
+                - Download and extract zip files.
+                - Parse JSON with orjson (if installed).
 Docs:       https://docs.python.org/3/library/pickle.html
+            https://docs.python.org/3/library/zipfile.html
+            https://github.com/ijl/orjson
 Author:     Alejandro Sánchez Cano
 Date:       02/10/2024
 ===============================================================================
 """
 
 # Built-in modules
+import os
+import mmap
+import shutil
+import struct
+import zipfile
+import tempfile
 import pickle as pkl
 from typing import Any
 
+# Third-party modules
+import requests
+
+# Fast JSON parser (orjson), falling back to the standard library
+try:
+    from orjson import loads as json_loads
+except ImportError:
+    from json import loads as json_loads
+
+# Header of the pickles with out-of-band buffers (see 'pickle()')
+OUT_OF_BAND = b'\x00PKL5OOB'
+
+# Pickles larger than this (4 MB) are memory-mapped (see 'unpickle()')
+MMAP_THRESHOLD = 4 * 1024 * 1024
+
 def pickle(data: Any, path: str) -> None:
     '''
-    Pickle an object and store it.
+    Pickle an object and store it. Pickle protocol 5 is used, so 
+    contiguous buffers (e.g. numpy arrays) are stored out-of-band after 
+    the pickle stream instead of being copied into it, and they can be 
+    unpickled without another copy. In that case, the file starts with
+    the OUT_OF_BAND header followed by the sizes of the pickle stream and
+    the buffers.
 
     Parameters
     ----------
@@ -24,16 +54,32 @@ def pickle(data: Any, path: str) -> None:
     path : str
         Storing path.
     '''
+    buffers = []
+    stream = pkl.dumps(
+        obj = data,
+        protocol = pkl.HIGHEST_PROTOCOL,
+        buffer_callback = buffers.append
+        )
+    raws = [buffer.raw() for buffer in buffers]
     with open(path, 'wb') as handle:
-        pkl.dump(
-            obj = data,
-            file = handle, 
-            protocol = pkl.HIGHEST_PROTOCOL
-            )
+        if raws:
+            sizes = [len(stream)] + [raw.nbytes for raw in raws]
+            handle.write(OUT_OF_BAND)
+            handle.write(struct.pack(f'<{len(sizes) + 1}Q', len(sizes), *sizes))
+        handle.write(stream)
+        for raw in raws:
+            handle.write(raw)
 
 def unpickle(path: str) -> Any:
     '''
-    Retrieves and unpickles a pickled object.
+    Retrieves and unpickles a pickled object. The whole file is read with
+    a single read call into a buffer, so the unpickler works from memory
+    instead of issuing many small reads. Files larger than 
+    MMAP_THRESHOLD are memory-mapped instead, so regular pickles are 
+    unpickled straight from the page cache. For pickles with out-of-band
+    buffers, the file ends up in a writable buffer (so that the mapping
+    and its file descriptor can be released) and the buffers are handed
+    to the unpickler as views of it, so numpy arrays are not copied again.
 
     Parameters
     ----------
@@ -45,5 +91,60 @@ def unpickle(path: str) -> Any:
     Any
         Unpickled object.
     '''
-    with open(path, 'rb') as handle:
-        return pkl.load(file = handle)
\ No newline at end of file
+    with open(path, 'rb', buffering = 0) as handle:
+        size = os.fstat(handle.fileno()).st_size
+
+        # Empty files cannot be memory-mapped (raises EOFError)
+        if size == 0:
+            return pkl.load(file = handle)
+        
+        # Large regular pickle
+        if size >= MMAP_THRESHOLD:
+            with mmap.mmap(handle.fileno(), 0, access = mmap.ACCESS_READ) as mapped:
+                if mapped[:len(OUT_OF_BAND)] != OUT_OF_BAND:
+                    return pkl.loads(mapped)
+                data = bytearray(mapped)
+        
+        # Small regular pickle
+        else:
+            data = bytearray(size)
+            handle.readinto(data)
+            if data[:len(OUT_OF_BAND)] != OUT_OF_BAND:
+                return pkl.loads(data)
+    
+    # Pickle with out-of-band buffers
+    view = memoryview(data)
+    offset = len(OUT_OF_BAND)
+    count, = struct.unpack_from('<Q', data, offset)
+    sizes = struct.unpack_from(f'<{count}Q', data, offset + 8)
+    offset += 8 * (count + 1)
+    chunks = []
+    for size in sizes:
+        chunks.append(view[offset : offset + size])
+        offset += size
+    stream, *buffers = chunks
+    return pkl.loads(stream, buffers = buffers)
+
+def download_zip(url: str, output_dir: str, members: list[str] = None) -> None:
+    '''
+    Downloads a zip file and extracts it without storing the compressed 
+    file. The HTTP response is streamed into a spooled temporary file, 
+    which is kept in memory unless it exceeds 256 MB.
+
+    Parameters
+    ----------
+    url : str
+        URL of the zip file.
+    output_dir : str
+        Directory where the zip file is extracted.
+    members : list[str], optional
+        Files of the zip file to extract, by default all of them.
+    '''
+    with requests.get(url, stream = True) as response:
+        response.raise_for_status()
+        response.raw.decode_content = True
+        with tempfile.SpooledTemporaryFile(max_size = 256 << 20) as handle:
+            shutil.copyfileobj(response.raw, handle)
+            handle.seek(0)
+            with zipfile.ZipFile(handle) as zip_file:
+                zip_file.extractall(output_dir, members = members)
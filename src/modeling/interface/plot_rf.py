@@ -14,12 +14,15 @@ from collections import defaultdict
 
 # Third-party modules
 import optuna
+from optuna.storages import JournalStorage
+from optuna.storages.journal import JournalFileBackend
 import numpy as np
 import sklearn as sk
 import matplotlib.pyplot as plt
 
 # Custom modules
 from src.misc import path
+from src.misc import utils
 from src.modeling.utils.performance import Performance
 
 splitting_strategies = [
@@ -29,23 +32,38 @@ splitting_strategies = [
     'INTRA0-INTRA1'
 ]
 
-# Fetch best eprfromances
+# Fetch best eprfromances (cached until the Optuna studies change)
+filename = 'rf'
+cache_path = path.OPTUNA / filename / 'best_performances.pkl'
+try:
+    best_performances = utils.unpickle(cache_path)
+except FileNotFoundError:
+    best_performances = {}
 performances = defaultdict(dict)
 for strategy in splitting_strategies:
-    filename = 'rf'
+    # Journal file, or SQLite file of the studies not migrated yet by rf.py
+    journal_path = path.OPTUNA / filename / f"{strategy}.log"
     db_path = path.OPTUNA / filename / f"{strategy}.db"
-    db_path.parent.mkdir(parents=True, exist_ok=True)
-    study = optuna.create_study(
-        direction="maximize",
-        storage=f"sqlite:///{str(db_path)}",
-        load_if_exists=True,
-        study_name=f"{str(filename)}_{strategy}"
-    )
-    best_trial = study.best_trial
-    best_performance = best_trial.user_attrs['performance']
-    performances[strategy] = Performance(**best_performance)    
+    study_path = journal_path if journal_path.exists() else db_path
+    mtime = study_path.stat().st_mtime
+    if best_performances.get(strategy, (None, None))[0] != mtime:
+        try:
+            best_performance = utils.unpickle(path.OPTUNA / filename / f"{strategy}.best.pkl")
+        except FileNotFoundError:
+            if study_path == journal_path:
+                storage = JournalStorage(JournalFileBackend(str(journal_path)))
+            else:
+                storage = f"sqlite:///{db_path}"
+            study = optuna.load_study(
+                storage=storage,
+                study_name=f"{str(filename)}_{strategy}"
+            )
+            best_performance = study.best_trial.user_attrs['performance']
+        best_performances[strategy] = (mtime, best_performance)
+    performances[strategy] = Performance(**best_performances[strategy][1])    
 
     print(f"Best performance for {strategy}: {performances[strategy].balanced_accuracy}")
+utils.pickle(data = best_performances, path = cache_path)
 
 # Plot ROC curves
 plt.figure(figsize=(10, 6))
@@ -16,35 +16,62 @@ Time:       ~2s/trial -> 2h for 500 trials and 4 strategies
 """
 
 # Built-in modules
+import os
+import multiprocessing
+from pathlib import Path
+from typing import Callable
+from functools import partial
 from collections import defaultdict
 
 # Third-party modules
 import optuna
+from optuna.storages import JournalStorage
+from optuna.storages.journal import JournalFileBackend
 import numpy as np
 import pandas as pd
 import sklearn as sk
 
 # Custom modules
 from src.misc import path
+from src.misc import utils
 from src.entities.ppi import PPI
 from src.misc.logger import logger
 from src.modeling.utils.performance import Performance
 
 # Load data
 ppis = [ppi for ppi in PPI.iterate('interface_features', 'partition', 'interaction', 'origin')]
-valid_ppis = []
-for idx, ppi in enumerate(ppis):
+scores = PPI.interact_batch(ppis)
+valid_ppis, valid_scores = [], []
+for idx, (ppi, score) in enumerate(zip(ppis, scores)):
     if ppi.interface_features is None:
         logger.warning(f"PPI {idx} does not have interface features. Skipping.") # Known error with PPI 5483 -> weird structure
-    elif ppi.interact() != '?':
+    elif score != '?':
         valid_ppis.append(ppi)
-X = pd.DataFrame([ppi.interface_features.copy() for ppi in valid_ppis])
-y = pd.Series([ppi.interact() for ppi in valid_ppis])
+        valid_scores.append(score)
+features = list(valid_ppis[0].interface_features)    # Same keys for all PPIs
+X = pd.DataFrame({
+    feature: np.fromiter(
+        (ppi.interface_features[feature] for ppi in valid_ppis), 
+        dtype = np.float64, 
+        count = len(valid_ppis)
+        )
+    for feature in features
+    })
+y = pd.Series(valid_scores)
 X_std = sk.preprocessing.StandardScaler().fit_transform(X)
-intra0 = [ppi.partition == 'INTRA0' for ppi in valid_ppis]
-intra1 = [ppi.partition == 'INTRA1' for ppi in valid_ppis]
-inter = [ppi.partition == 'INTER' for ppi in valid_ppis]
+partitions = np.array([ppi.partition for ppi in valid_ppis])
+intra0 = partitions == 'INTRA0'
+intra1 = partitions == 'INTRA1'
+inter = partitions == 'INTER'
 assert len(X_std) == len(y) == len(intra0) == len(intra1) == len(inter)
+subsets = {                             # Sliced once, shared by strategies
+    'INTRA0': (X_std[intra0], y[intra0]),
+    'INTRA1': (X_std[intra1], y[intra1]),
+    'INTER': (X_std[inter], y[inter])
+    }
+
+# Test probabilities of the trials run by this process (by trial number)
+trial_probs = {}
 
 # Optimization function
 def train_objective(
@@ -81,7 +108,8 @@ def train_objective(
         max_depth=max_depth,
         min_samples_split=min_samples_split,
         min_samples_leaf=min_samples_leaf,
-        random_state=42
+        random_state=42,
+        n_jobs=1                            # Parallelism is across trials
     )
 
     # Train and evaluate
@@ -90,12 +118,57 @@ def train_objective(
     y_proba = rf.predict_proba(X_test)[:, 1]
     y_test = y_test.to_numpy()
     performance = Performance(true = y_test, probs = y_proba)
-    trial.set_user_attr(                    # Performance object is not  
-        'performance',                      # JSON serializable
-        {'true': y_test.tolist(), 'probs': y_proba.tolist()}
-        )
+    trial_probs[trial.number] = y_proba.astype(np.float32)
     return performance.balanced_accuracy
 
+# Best trial callback
+def save_best_trial(strategy: str, y_test: pd.Series) -> Callable[[optuna.Study, optuna.trial.FrozenTrial], None]:
+    '''
+    Creates an Optuna callback that pickles the test labels and 
+    probabilities of a trial only if it is the best trial of the study so
+    far, instead of storing them in the study for every trial.
+
+    Parameters
+    ----------
+    strategy : str
+        The splitting strategy of the study.
+    y_test : pd.Series
+        Test labels.
+
+    Returns
+    -------
+    Callable[[optuna.Study, optuna.trial.FrozenTrial], None]
+        Optuna callback.
+    '''
+    def callback(study: optuna.Study, trial: optuna.trial.FrozenTrial) -> None:
+        probs = trial_probs.pop(trial.number, None)
+        if probs is None or trial.state != optuna.trial.TrialState.COMPLETE:
+            return
+        if study.best_trial.number == trial.number:
+            utils.pickle(
+                data = {'true': y_test.to_numpy().tolist(), 'probs': probs.tolist()},
+                path = trial_path(strategy, trial.number)
+                )
+    return callback
+
+def trial_path(strategy: str, number: int) -> Path:
+    '''
+    Path of the pickled test labels and probabilities of a trial.
+
+    Parameters
+    ----------
+    strategy : str
+        The splitting strategy of the study.
+    number : int
+        Trial number.
+
+    Returns
+    -------
+    Path
+        Pickle path.
+    '''
+    return path.OPTUNA / 'rf' / f"{strategy}.trial{number}.pkl"
+
 # Split function
 def split(strategy: str) -> tuple[np.ndarray, np.ndarray, pd.Series, pd.Series]:
     """
@@ -120,25 +193,25 @@ def split(strategy: str) -> tuple[np.ndarray, np.ndarray, pd.Series, pd.Series]:
         X_train, X_test, y_train, y_test = split
     elif strategy == 'INTRA0-INTER':
         if len(intra0) > len(inter):
-            X_train, y_train = X_std[intra0], y[intra0]
-            X_test, y_test = X_std[inter], y[inter]
+            X_train, y_train = subsets['INTRA0']
+            X_test, y_test = subsets['INTER']
         else:
-            X_train, y_train = X_std[inter], y[inter]
-            X_test, y_test = X_std[intra0], y[intra0]
+            X_train, y_train = subsets['INTER']
+            X_test, y_test = subsets['INTRA0']
     elif strategy == 'INTRA1-INTER':
         if len(intra1) > len(inter):
-            X_train, y_train = X_std[intra1], y[intra1]
-            X_test, y_test = X_std[inter], y[inter]
+            X_train, y_train = subsets['INTRA1']
+            X_test, y_test = subsets['INTER']
         else:
-            X_train, y_train = X_std[inter], y[inter]
-            X_test, y_test = X_std[intra1], y[intra1]
+            X_train, y_train = subsets['INTER']
+            X_test, y_test = subsets['INTRA1']
     elif strategy == 'INTRA0-INTRA1':
         if len(intra0) > len(intra1):
-            X_train, y_train = X_std[intra0], y[intra0]
-            X_test, y_test = X_std[intra1], y[intra1]
+            X_train, y_train = subsets['INTRA0']
+            X_test, y_test = subsets['INTRA1']
         else:
-            X_train, y_train = X_std[intra1], y[intra1]
-            X_test, y_test = X_std[intra0], y[intra0]
+            X_train, y_train = subsets['INTRA1']
+            X_test, y_test = subsets['INTRA0']
 
     return X_train, X_test, y_train, y_test
 
@@ -151,8 +224,39 @@ default = {
     "max_features": "auto"
 }
 
+# Worker process
+def optimize(strategy: str, journal_path: str, study_name: str, n_trials: int) -> None:
+    '''
+    Runs trials of a shared Optuna study in a worker process until the
+    study reaches n_trials trials across all workers.
+
+    Parameters
+    ----------
+    strategy : str
+        The splitting strategy to use.
+    journal_path : str
+        Path of the Optuna journal file shared by the workers.
+    study_name : str
+        Name of the Optuna study.
+    n_trials : int
+        Total number of trials of the study.
+    '''
+    splitted_sets = splits[strategy]
+    storage = JournalStorage(JournalFileBackend(journal_path))
+    study = optuna.load_study(study_name=study_name, storage=storage)
+    objective = partial(train_objective, splitted_sets=splitted_sets)
+    study.optimize(
+        objective, 
+        callbacks=[
+            optuna.study.MaxTrialsCallback(n_trials, states=None),
+            save_best_trial(strategy, splitted_sets[-1])
+            ]
+        )
+
 # Train and optimize
 n_trials = 500
+n_workers = os.cpu_count() or 4             # One RF (n_jobs=1) per worker
+context = multiprocessing.get_context('fork')   # Workers inherit the data
 performances = defaultdict(dict)
 splitting_strategies = [
     'random', 
@@ -160,24 +264,49 @@ splitting_strategies = [
     'INTRA1-INTER', 
     'INTRA0-INTRA1'
 ]
+splits = {strategy: split(strategy) for strategy in splitting_strategies}
 for strategy in splitting_strategies:
-    splitted_sets = split(strategy)
     filename = 'rf'
     db_path = path.OPTUNA / filename / f"{strategy}.db"
-    db_path.parent.mkdir(parents=True, exist_ok=True)
+    journal_path = db_path.with_suffix('.log')
+    journal_path.parent.mkdir(parents=True, exist_ok=True)
+    storage = JournalStorage(JournalFileBackend(str(journal_path)))
+    study_name = f"{str(filename)}_{strategy}"
+    if db_path.exists() and not journal_path.exists():     # Migrate SQLite study
+        optuna.copy_study(
+            from_study_name=study_name, 
+            from_storage=f"sqlite:///{str(db_path)}", 
+            to_storage=storage
+        )
     study = optuna.create_study(
         direction="maximize",
-        storage=f"sqlite:///{str(db_path)}",
+        storage=storage,
         load_if_exists=True,
-        study_name=f"{str(filename)}_{strategy}"
+        study_name=study_name
     )
-    objective = lambda trial: train_objective(trial, splitted_sets)
     study.enqueue_trial(default)
-    study.optimize(
-        objective, 
-        n_trials=n_trials - len(study.trials) if n_trials - len(study.trials) > 0 else 0, 
-        show_progress_bar=True, 
-        n_jobs=4)
+    if len(study.trials) < n_trials:
+        # Default trial first, so that workers do not race for it
+        splitted_sets = splits[strategy]
+        study.optimize(
+            partial(train_objective, splitted_sets=splitted_sets), 
+            n_trials=1, 
+            callbacks=[save_best_trial(strategy, splitted_sets[-1])]
+            )
+        with context.Pool(n_workers) as pool:
+            pool.starmap(optimize, [(strategy, str(journal_path), study_name, n_trials)] * n_workers)
+
+    # Keep only the best trial (older studies stored it as a user attribute)
     best_trial = study.best_trial
-    best_performance = best_trial.user_attrs['performance']
-    performances[strategy] = Performance(**best_performance)
\ No newline at end of file
+    best_path = path.OPTUNA / filename / f"{strategy}.best.pkl"
+    try:
+        best_performance = utils.unpickle(trial_path(strategy, best_trial.number))
+        utils.pickle(data = best_performance, path = best_path)
+    except FileNotFoundError:
+        if 'performance' in best_trial.user_attrs:
+            best_performance = best_trial.user_attrs['performance']
+        else:
+            best_performance = utils.unpickle(best_path)
+    for trial_file in journal_path.parent.glob(f"{strategy}.trial*.pkl"):
+        trial_file.unlink()
+    performances[strategy] = Performance(**best_performance)
@@ -46,6 +46,9 @@ if torch.cuda.is_available():
     for i in range(torch.cuda.device_count()):
         logger.info(f'GPU {i}: {torch.cuda.get_device_name(i)}')
 
+# Inputs are padded to a fixed size, so cuDNN can benchmark its algorithms once
+torch.backends.cudnn.benchmark = True
+
 # Load and pad dataset
 ppis = [ppi for ppi in PPI.iterate('distance_map.CA') if ppi.interact() != '?']
 cmaps = [ppi.distance_map['CA'].cmap(8) for ppi in tqdm(ppis, desc='Loading PPI maps')]
@@ -55,8 +58,11 @@ X = [cmap.pad(max_size).matrix for cmap in cmaps]
 X = torch.tensor(np.array(X), dtype=torch.float32).unsqueeze(1)
 y = [ppi.interact() for ppi in ppis]
 y = torch.tensor(np.array(y), dtype=torch.long)
+
+# Keep the padded dataset on the device, so that batches are gathered there
+X, y = X.to(device), y.to(device)
 input_dataset = CustomDataset(y=y, cmap=X)
-data_loader = torch.utils.data.DataLoader(input_dataset, batch_size=config['batch_size'], shuffle=True)
+data_loader = torch.utils.data.DataLoader(input_dataset, batch_size=config['batch_size'], shuffle=True, collate_fn=input_dataset.collate_fn)
 
 # Split dataset
 split = Split(
@@ -70,6 +76,7 @@ split = Split(
 cnn = modelhub.CCL(max_shape=max_size)
 cnn.to(device)
 criterion = torch.nn.BCEWithLogitsLoss()
+scaler = torch.amp.GradScaler('cuda', enabled=device.type == 'cuda')
 optimizer = torch.optim.AdamW(
     cnn.parameters(), 
     lr = config['lr'], 
@@ -83,11 +90,11 @@ early_stopping = EarlyStopping(
 tracker = Tracker()
 for epoch in tqdm(range(config['epochs'])):
     # Train
-    train(model=cnn, train_loader=split.train_loader, criterion=criterion, optimizer=optimizer, device=device)
+    train(model=cnn, train_loader=split.train_loader, criterion=criterion, optimizer=optimizer, device=device, scaler=scaler)
     # Evaluate on training set
-    train_results = evaluate(model=cnn, loader=split.train_loader, criterion=criterion, device=device)
+    train_results = evaluate(model=cnn, loader=split.train_loader, criterion=criterion, device=device, amp=scaler.is_enabled())
     # Evaluate on test set
-    test_results = evaluate(model=cnn, loader=split.val_loader, criterion=criterion, device=device)
+    test_results = evaluate(model=cnn, loader=split.val_loader, criterion=criterion, device=device, amp=scaler.is_enabled())
     # Performance
     train_performance = Performance(true=train_results['labels'], logits=train_results['logits'])
     test_performance = Performance(true=test_results['labels'], logits=test_results['logits'])
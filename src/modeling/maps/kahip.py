@@ -56,7 +56,7 @@ X = torch.tensor(np.array(X), dtype=torch.float32).unsqueeze(1)
 y = [ppi.interact() for ppi in ppis]
 y = torch.tensor(np.array(y), dtype=torch.long)
 input_dataset = CustomDataset(y=y, cmap=X)
-data_loader = torch.utils.data.DataLoader(input_dataset, batch_size=config['batch_size'], shuffle=True)
+data_loader = torch.utils.data.DataLoader(input_dataset, batch_size=config['batch_size'], shuffle=True, collate_fn=input_dataset.collate_fn)
 
 # Split dataset
 cluster_membersip = {0: [], 1: []}
@@ -12,37 +12,33 @@ from src.entities.ppi import PPI
 from src.misc.logger import logger
 
 # Load data
-ppis = [ppi for ppi in PPI.iterate() if ppi.interact() != '?']
+ppis = list(PPI.iterate())
+scores = PPI.interact_batch(ppis)
+ppis = [ppi for ppi, score in zip(ppis, scores) if score != '?']
+y = np.array([score for score in scores if score != '?'])
+partitions = np.array([ppi.partition for ppi in ppis])
+intra0 = partitions == 'INTRA0'
+intra1 = partitions == 'INTRA1'
+inter = partitions == 'INTER'
 
 # Iterate over ESM2 models and seeds
 esm2_models = ['8M', '35M', '150M', '650M','3B']
 seeds = range(10)
-results = pd.DataFrame(columns=[
-    'Model',
-    'Partition',
-    'Seed',
-    'Balanced Accuracy',
-])
+results = []
 for model in esm2_models:
-    for seed in seeds:
 
-        # Collect data
-        X, y = [], []
-        for ppi in ppis:
-            emb1 = ppi.p1.esm2_embeddings[model].copy().mean(0)
-            emb2 = ppi.p2.esm2_embeddings[model].copy().mean(0)
-            x = np.concatenate([emb1, emb2])
-            X.append(x)
-            y.append(ppi.interact())
-        X = np.stack(X)
-        y = np.array(y)
+    # Collect data (independent of the seed) into a preallocated matrix
+    D = ppis[0].p1.esm2_embeddings[model].shape[-1]
+    X = np.empty((len(ppis), 2 * D), dtype = np.float32)
+    for i, ppi in enumerate(ppis):
+        ppi.p1.esm2_embeddings[model].mean(0, out = X[i, :D])
+        ppi.p2.esm2_embeddings[model].mean(0, out = X[i, D:])
+    assert len(X) == len(y) == len(intra0) == len(intra1) == len(inter)
+
+    for seed in seeds:
 
         # Split data and evaluate models
         splitting_strategies = ['random', 'INTRA0-INTER', 'INTRA1-INTER', 'INTRA0-INTRA1' ]
-        intra0 = [ppi.partition == 'INTRA0' for ppi in ppis]
-        intra1 = [ppi.partition == 'INTRA1' for ppi in ppis]
-        inter = [ppi.partition == 'INTER' for ppi in ppis]
-        assert len(X) == len(y) == len(intra0) == len(intra1) == len(inter)
         for strategy in splitting_strategies:
             if strategy == 'random':
                 X_train, X_test, y_train, y_test = sk.model_selection.train_test_split(X, y, test_size=0.2, random_state=42)
@@ -80,17 +76,15 @@ for model in esm2_models:
             logger.info(f"Strategy: {strategy}, ROC AUC: {roc_auc:.2f}, Balanced Accuracy: {balanced_accuracy:.2f}")
 
             # Store results
-            results = pd.concat([
-                results,
-                pd.DataFrame({
-                    'Model': [model],
-                    'Partition': [strategy],
-                    'Seed': [seed],
-                    'Balanced Accuracy': [balanced_accuracy],
-                })
-            ], ignore_index=True)
+            results.append({
+                'Model': model,
+                'Partition': strategy,
+                'Seed': seed,
+                'Balanced Accuracy': balanced_accuracy,
+            })
 
 # Plot results
+results = pd.DataFrame(results)
 sns.boxplot(data=results, x='Partition', y='Balanced Accuracy', hue='Model')
 plt.title("Balanced Accuracy across Partition Strategies")
 plt.savefig('balanced_accuracy_results.png', dpi=300, bbox_inches='tight')
\ No newline at end of file
@@ -1,3 +1,6 @@
+# Built-in modules
+import logging
+
 # Third-party modules
 import torch
 import numpy as np
@@ -12,14 +15,14 @@ class CustomDataset(Dataset):
         assert np.all([len(X) == len(y) for X in Xs.values()]), 'Number of X and y must be equal'
         self.y = y.long()
         self.Xs = Xs
-        self.indeces = torch.arange(len(self.y))
+        self.indeces = torch.arange(len(self.y), device=self.y.device)
 
         # Logging
         for key, X in self.Xs.items():
             logger.info(f'Data "{key}" shape: {X.shape}')
         logger.info(f'y shape: {self.y.shape}')
-        logger.info(f'Positive y: {sum(self.y).item()}')
-        logger.info(f'Negative y: {(len(self.y) - sum(self.y)).item()}')
+        logger.info(f'Positive y: {self.y.sum().item()}')
+        logger.info(f'Negative y: {(len(self.y) - self.y.sum()).item()}')
 
     def __len__(self) -> int:
         '''
@@ -32,9 +35,10 @@ class CustomDataset(Dataset):
         '''
         return len(self.y)
 
-    def __getitem__(self, idx: int) -> tuple[torch.Tensor, int]:
+    def __getitem__(self, idx: int) -> int:
         '''
-        Get item method to return a sample from the dataset.
+        Get item method to return a sample from the dataset. Only the index
+        is returned; the sample itself is gathered batch-wise by collate_fn.
 
         Parameters
         ----------
@@ -43,13 +47,28 @@ class CustomDataset(Dataset):
 
         Returns
         -------
-        tuple[torch.Tensor, int]
-            Tuple with the image and the label.
+        int
+            Index of the sample.
         '''
-        logger.debug(f"Fetching index {idx}: label {self.y[idx]}, index {self.indeces[idx]}")
-        
-        index = self.indeces[idx]
-        y = self.y[idx]
-        Xs = [X[idx] for X in self.Xs.values()]
-        
-        return index, y, *Xs
\ No newline at end of file
+        return idx
+
+    def collate_fn(self, indeces: list[int]) -> tuple[torch.Tensor, ...]:
+        '''
+        Collate function to gather a whole batch with a single fancy index
+        per tensor, instead of indexing and stacking every sample.
+
+        Parameters
+        ----------
+        indeces : list[int]
+            Indeces of the samples in the batch.
+
+        Returns
+        -------
+        tuple[torch.Tensor, ...]
+            Tuple with the indeces, the labels, and the data tensors.
+        '''
+        indeces = torch.as_tensor(indeces, device=self.y.device)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"Fetching indeces {indeces.tolist()}: labels {self.y[indeces].tolist()}")
+
+        return self.indeces[indeces], self.y[indeces], *[X[indeces] for X in self.Xs.values()]
@@ -13,17 +13,24 @@ Date:       01/10/2024
 
 # Built-in modules
 from typing import Literal
+from functools import cached_property
 
 # Third-party modules
-import torch
 import numpy as np
 import sklearn.metrics as sk
 import matplotlib.pyplot as plt
+from scipy.special import expit
 from sklearn.calibration import CalibrationDisplay
 
 class Performance:
 
-    def __init__(self, true: np.ndarray, logits: np.ndarray, threshold: float = 0.5):
+    def __init__(
+            self, 
+            true: np.ndarray, 
+            logits: np.ndarray | None = None, 
+            probs: np.ndarray | None = None,
+            threshold: float = 0.5
+            ):
         '''
         Class constructor.
 
@@ -31,16 +38,55 @@ class Performance:
         ----------
         true : np.ndarray
             True labels.
-        logits : np.ndarray
-            Logits from the model.
+        logits : np.ndarray | None, optional
+            Logits from the model, by default None.
+        probs : np.ndarray | None, optional
+            Probabilities from the model, by default None. Used as they are
+            instead of applying the sigmoid to the logits.
         threshold : float, optional
-            Threshold to convert logits into probabilities, by default 0.5.
+            Threshold to convert probabilities into predictions, by default 0.5.
         '''
+        assert (logits is None) != (probs is None), 'Either logits or probs must be provided'
         self.true = true
-        self.prob = torch.sigmoid(torch.tensor(logits)).cpu().numpy()
+        self.prob = np.asarray(probs) if probs is not None else expit(np.asarray(logits))
         self.pred = self.prob > threshold
 
-    @property
+    @cached_property
+    def confusion_matrix(self) -> np.ndarray:
+        '''
+        Confusion matrix metric, computed once and reused by the other 
+        metrics: [[TN, FP], [FN, TP]].
+
+        Returns
+        -------
+        np.ndarray
+            Confusion matrix.
+        '''
+        true = np.asarray(self.true).astype(np.intp)
+        pred = np.asarray(self.pred).astype(np.intp)
+        return np.bincount(2 * true + pred, minlength = 4).reshape(2, 2)
+
+    @staticmethod
+    def _divide(numerator: float, denominator: float) -> float:
+        '''
+        Division that returns 0 when the denominator is 0, like the 
+        zero_division default of sklearn.
+
+        Parameters
+        ----------
+        numerator : float
+            Numerator.
+        denominator : float
+            Denominator.
+
+        Returns
+        -------
+        float
+            Quotient.
+        '''
+        return float(numerator / denominator) if denominator else 0.0
+
+    @cached_property
     def accuracy(self) -> float:
         '''	
         Accuracy metric: (TP + TN) / (TP + TN + FP + FN).
@@ -50,21 +96,25 @@ class Performance:
         float
             Accuracy.
         '''
-        return sk.accuracy_score(self.true, self.pred)
+        (tn, fp), (fn, tp) = self.confusion_matrix
+        return Performance._divide(tp + tn, tp + tn + fp + fn)
     
-    @property
+    @cached_property
     def balanced_accuracy(self) -> float:
         '''
-        Balanced accuracy metric: (TPR + TNR) / 2.
+        Balanced accuracy metric: (TPR + TNR) / 2. Classes absent from the 
+        true labels are left out of the average, as in sklearn.
 
         Returns
         -------
         float
             Balanced accuracy.
         '''
-        return sk.balanced_accuracy_score(self.true, self.pred)
+        (tn, fp), (fn, tp) = self.confusion_matrix
+        rates = [hits / (hits + misses) for hits, misses in ((tp, fn), (tn, fp)) if hits + misses]
+        return float(np.mean(rates)) if rates else 0.0
     
-    @property
+    @cached_property
     def precision(self) -> float:
         '''
         Precision metric: TP / (TP + FP).
@@ -74,9 +124,10 @@ class Performance:
         float
             Precision.
         '''
-        return sk.precision_score(self.true, self.pred)
+        (tn, fp), (fn, tp) = self.confusion_matrix
+        return Performance._divide(tp, tp + fp)
     
-    @property
+    @cached_property
     def recall(self) -> float:
         '''
         Recall metric: TP / (TP + FN).
@@ -86,9 +137,10 @@ class Performance:
         float
             Recall.
         '''
-        return sk.recall_score(self.true, self.pred)
+        (tn, fp), (fn, tp) = self.confusion_matrix
+        return Performance._divide(tp, tp + fn)
     
-    @property
+    @cached_property
     def f1(self) -> float:
         '''
         F1 score metric: 2 * (precision * recall) / (precision + recall).
@@ -98,9 +150,10 @@ class Performance:
         float
             F1 score.
         '''
-        return sk.f1_score(self.true, self.pred)
+        (tn, fp), (fn, tp) = self.confusion_matrix
+        return Performance._divide(2 * tp, 2 * tp + fp + fn)
     
-    @property
+    @cached_property
     def mcc(self) -> float:
         '''
         Matthews correlation coefficient metric: 
@@ -111,29 +164,18 @@ class Performance:
         float
             Matthews correlation coefficient.
         '''
-        return sk.matthews_corrcoef(self.true, self.pred)
-    
-    @property
-    def confusion_matrix(self) -> np.ndarray:
-        '''
-        Confusion matrix metric.
-
-        Returns
-        -------
-        np.ndarray
-            Confusion matrix.
-        '''
-        return sk.confusion_matrix(self.true, self.pred)
+        (tn, fp), (fn, tp) = self.confusion_matrix.astype(np.float64)
+        denominator = np.sqrt((tp + fp) * (tp + fn) * (tn + fp) * (tn + fn))
+        return Performance._divide(tp * tn - fp * fn, denominator)
     
     def plot_confusion_matrix(self) -> None:
         '''Plot the confusion matrix.'''
-        cm = sk.confusion_matrix(self.true, self.pred)
-        cm = sk.ConfusionMatrixDisplay(cm, display_labels = ['-', '+'])
+        cm = sk.ConfusionMatrixDisplay(self.confusion_matrix, display_labels = ['-', '+'])
         cm.plot()
         plt.savefig('confusion_matrix.png')
         plt.clf()
     
-    @property
+    @cached_property
     def classification_report(self) -> str:
         '''
         Classification report metric.
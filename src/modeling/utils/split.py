@@ -52,6 +52,7 @@ class Split:
         # Attributes
         self.dataset = data_loader.dataset
         self.batch_size = batch_size
+        self.collate_fn = data_loader.collate_fn
         self.train_size, self.val_size, self.test_size = sizes
         self.kfold = kfold
         self.cluster_membership = cluster_membership
@@ -99,9 +100,9 @@ class Split:
         )
 
         # Create data loaders
-        train_loader = DataLoader(train_dataset, batch_size=self.batch_size, shuffle=True)
-        val_loader = DataLoader(val_dataset, batch_size=self.batch_size, shuffle=False)
-        test_loader = DataLoader(test_dataset, batch_size=self.batch_size, shuffle=False)
+        train_loader = DataLoader(train_dataset, batch_size=self.batch_size, shuffle=True, collate_fn=self.collate_fn)
+        val_loader = DataLoader(val_dataset, batch_size=self.batch_size, shuffle=False, collate_fn=self.collate_fn)
+        test_loader = DataLoader(test_dataset, batch_size=self.batch_size, shuffle=False, collate_fn=self.collate_fn)
 
         # Logging
         logger.info(f'Train size: {len(train_dataset)}')
@@ -139,9 +140,9 @@ class Split:
         train_dataset = Subset(self.dataset, train_idx)
         val_dataset = Subset(self.dataset, val_idx)
         test_dataset = Subset(self.dataset, test_idx)
-        train_loader = DataLoader(train_dataset, batch_size=self.batch_size, shuffle=True)
-        val_loader = DataLoader(val_dataset, batch_size=self.batch_size, shuffle=False)
-        test_loader = DataLoader(test_dataset, batch_size=self.batch_size, shuffle=False)
+        train_loader = DataLoader(train_dataset, batch_size=self.batch_size, shuffle=True, collate_fn=self.collate_fn)
+        val_loader = DataLoader(val_dataset, batch_size=self.batch_size, shuffle=False, collate_fn=self.collate_fn)
+        test_loader = DataLoader(test_dataset, batch_size=self.batch_size, shuffle=False, collate_fn=self.collate_fn)
 
         # Logging
         logger.info(f'Train size: {len(train_dataset)}')
@@ -174,13 +175,13 @@ class Split:
         for train_idx, val_idx in kf.split(train_val_dataset):
             train_subset = Subset(train_val_dataset, train_idx)
             val_subset = Subset(train_val_dataset, val_idx)
-            train_loader = DataLoader(train_subset, batch_size=self.batch_size, shuffle =True)
-            val_loader = DataLoader(val_subset, batch_size=self.batch_size, shuffle=False)
+            train_loader = DataLoader(train_subset, batch_size=self.batch_size, shuffle =True, collate_fn=self.collate_fn)
+            val_loader = DataLoader(val_subset, batch_size=self.batch_size, shuffle=False, collate_fn=self.collate_fn)
             train_loaders.append(train_loader)
             val_loaders.append(val_loader)
 
         # Test loader
-        test_loader = DataLoader(test_dataset, batch_size=self.batch_size, shuffle=False)
+        test_loader = DataLoader(test_dataset, batch_size=self.batch_size, shuffle=False, collate_fn=self.collate_fn)
 
         # Logging
         logger.info(f'Train + validation size: {len(train_subset) + len(val_subset)} divided in {self.kfold} folds')
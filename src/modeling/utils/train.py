@@ -24,7 +24,8 @@ def train(
         train_loader: DataLoader,
         criterion: nn. Module,
         optimizer: optim.Optimizer,
-        device: torch.device
+        device: torch.device,
+        scaler: torch.amp.GradScaler | None = None
         ) -> None:
     '''
     Train deep learning model.
@@ -41,31 +42,41 @@ def train(
         Optimization algorithm
     device : torch.device
         Device to run the model (CPU or GPU)
+    scaler : torch.amp.GradScaler | None, optional
+        Gradient scaler for mixed precision training, by default None (FP32).
+        The forward pass runs under autocast if the scaler is enabled.
     '''
     
     model.train()                           # Train mode
     running_loss = 0.0                      # Accumulate loss
 
     for _, labels, *inputs in train_loader:
-        inputs = [input.to(device) for input in inputs] # Send to device
-        labels = labels.to(device)          # Send to device
+        inputs = [input.to(device, non_blocking=True) for input in inputs] # Send to device
+        labels = labels.to(device, non_blocking=True) # Send to device
         labels = labels.float()             # Convert to float
         optimizer.zero_grad()               # Zero gradients
-        outputs = model(*inputs)             # Forward pass
-        outputs = outputs.squeeze(1)        # Squeeze output
-        logger.debug(f'Outputs shape: {outputs.shape}')
-        logger.debug(f'Labels type: {labels.dtype}')
-        logger.debug(f'Outputs type: {outputs.dtype}')
-        loss = criterion(outputs, labels)   # Compute loss
-        loss.backward()                     # Backward pass
-        optimizer.step()                    # Update weights
+        with torch.autocast(device_type=device.type, enabled=scaler is not None and scaler.is_enabled()):
+            outputs = model(*inputs)        # Forward pass
+            outputs = outputs.squeeze(1)    # Squeeze output
+            logger.debug(f'Outputs shape: {outputs.shape}')
+            logger.debug(f'Labels type: {labels.dtype}')
+            logger.debug(f'Outputs type: {outputs.dtype}')
+            loss = criterion(outputs, labels) # Compute loss
+        if scaler is None:
+            loss.backward()                 # Backward pass
+            optimizer.step()                # Update weights
+        else:
+            scaler.scale(loss).backward()   # Backward pass on scaled loss
+            scaler.step(optimizer)          # Unscale gradients and update weights
+            scaler.update()                 # Update scale factor
         running_loss += loss.item()         # Accumulate loss
 
 def evaluate(
         model: nn.Module,
         loader: DataLoader,
         criterion: nn.Module,
-        device: torch.device    
+        device: torch.device,
+        amp: bool = False
         ) -> dict[str, float | np.ndarray]:
     '''
     Evaluate deep learning model.
@@ -80,6 +91,8 @@ def evaluate(
         Loss function
     device : torch.device
         Device to run the model (CPU or GPU)
+    amp : bool, optional
+        Whether to run the forward pass under autocast, by default False.
 
     Returns
     -------
@@ -93,13 +106,13 @@ def evaluate(
     total_idx = np.array([])                # Accumulate indices
     total_logits = np.array([])             # Accumulate logits
 
-    with torch.no_grad():
+    with torch.no_grad(), torch.autocast(device_type=device.type, enabled=amp):
         for indeces, labels, *inputs in loader:
-            inputs = [input.to(device) for input in inputs] # Send to device
-            labels = labels.to(device)                  # Send to device
+            inputs = [input.to(device, non_blocking=True) for input in inputs] # Send to device
+            labels = labels.to(device, non_blocking=True) # Send to device
             labels = labels.float()                     # Convert to float
             logits = model(*inputs)                      # Forward pass
-            logits = logits.squeeze(1)                  # Squeeze logits
+            logits = logits.squeeze(1).float()          # Squeeze logits
             loss = criterion(logits, labels)            # Compute loss
             running_loss += loss.item()                 # Accumulate loss
 